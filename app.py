@@ -1,5 +1,6 @@
 # Import necessary libraries
 import streamlit as st
+from utils.warmup import start_warmup, warmup_status
 
 # Configure the page
 st.set_page_config(
@@ -18,6 +19,10 @@ st.markdown("""
     </style> 
 """, unsafe_allow_html=True)
 
+# Load the heavy libraries and the models in the background while this page renders,
+# so the first prediction after a deploy is as fast as later ones
+start_warmup()
+
 def main():
     st.header('Customer Churn Prediction App')
 
@@ -52,6 +57,7 @@ def main():
             * **Dashboard**: Visualize key metrics and trends through interactive charts and graphs.
             * **Predict**: Use our predictive models to estimate the likelihood of customer churn based on various factors.
             * **History**: Review past predictions and track changes over time.
+            * **Metrics**: See where time goes in each prediction, dashboard render and data load.
             """)
 
     # Key Advantages
@@ -95,5 +101,17 @@ def main():
             - **LinkedIn**: [Connect on LinkedIn](http://www.linkedin.com/in/justice-hanson)
             """)
 
+    # Startup timings
+    with cols[1]:
+        status = warmup_status()
+        with st.expander(f"Startup: models {status['state']}"):
+            if status.get('seconds') is not None:
+                st.caption(f"Warm-up finished in {status['seconds']:.2f}s")
+            if status['error']:
+                st.error(status['error'])
+            if status['timings']:
+                st.dataframe([{'Step': row['step'], 'Name': row['name'], 'Seconds': round(row['seconds'], 3)}
+                              for row in status['timings']], hide_index=True, use_container_width=True)
+
 if __name__ == '__main__':
     main()
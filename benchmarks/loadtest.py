@@ -0,0 +1,321 @@
+# Concurrent-session load test for the whole app.
+#
+# Run from the repository root with:
+#     python -m benchmarks.loadtest --users 1 5 10 25 50 --duration 60
+#     python -m benchmarks.loadtest --url http://127.0.0.1:8501 --pid 1234
+#
+# Starts the app with `streamlit run app.py` on a free port (or targets a
+# running one with --url) and drives simulated browser sessions over
+# Streamlit's websocket protocol, so every interaction is a real script
+# rerun on the server. Each session repeatedly picks a scenario from a
+# weighted mix of Predict, Dashboard, Data View and History interactions.
+# Every concurrency level reports throughput, latency percentiles, errors
+# and the memory of the app process, and the results are saved as JSON.
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+# Define file paths
+results_dir = './benchmarks/results'
+
+# Interaction mix: (weight, steps). A step opens a page, picks an option in a
+# selectbox or radio by its label, or presses a (form submit) button.
+scenarios = {
+    'predict_single': (0.35, [('open', 'Predict'), ('submit', 'Predict')]),
+    'predict_compare': (0.10, [('open', 'Predict'), ('select', 'Prediction mode', 'Compare Models'),
+                                ('submit', 'Predict')]),
+    'dashboard_kpis': (0.15, [('open', 'Dashboard'), ('select', 'Choose viz to display', 'KPIs Dashboard')]),
+    'dashboard_eda': (0.10, [('open', 'Dashboard'), ('select', 'Choose viz to display', 'EDA Dashboard')]),
+    'data_view': (0.15, [('open', 'Data View'), ('select', 'Choose columns to be viewed', 'Numeric Columns')]),
+    'history': (0.15, [('open', 'History'), ('rerun',)]),
+}
+
+rerun_timeout = 120.0
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+# -------- Resident memory of a process and its children, from /proc (Linux only)
+def process_rss(pid):
+    def rss(one_pid):
+        try:
+            with open(f'/proc/{one_pid}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def children(one_pid):
+        found = []
+        try:
+            for task in os.listdir(f'/proc/{one_pid}/task'):
+                with open(f'/proc/{one_pid}/task/{task}/children') as children_file:
+                    found += [int(child) for child in children_file.read().split()]
+        except OSError:
+            pass
+        return found
+
+    if pid is None or not os.path.exists('/proc'):
+        return None
+    pending, total = [pid], 0
+    while pending:
+        current = pending.pop()
+        total += rss(current)
+        pending += children(current)
+    return total
+
+
+# -------- One simulated browser tab
+class Session:
+    def __init__(self, url):
+        self.stream_url = url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self.connection = None
+        self.pages = {}
+        self.page = None
+        self.widgets = {}
+        self.elements = []
+
+    async def connect(self):
+        self.connection = await websocket_connect(self.stream_url, max_message_size=256 * 1024 * 1024)
+        # The first run of the main script tells the session which pages exist
+        await self.rerun()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def _find(self, label, kinds):
+        for kind, element in reversed(self.elements):
+            if kind in kinds and getattr(element, 'label', None) == label:
+                return element
+        raise LookupError(f'No {"/".join(kinds)} labelled {label!r} on page {self.page!r}')
+
+    async def rerun(self, trigger=None):
+        message = BackMsg()
+        client_state = message.rerun_script
+        # Select rerun_script even when no field below is set, or the message serializes to nothing
+        client_state.SetInParent()
+        if self.page is not None:
+            client_state.page_script_hash = self.pages[self.page]
+        for widget_id, (field, value) in self.widgets.items():
+            state = client_state.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+        if trigger is not None:
+            state = client_state.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+
+        start = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        elements, error = [], None
+        while True:
+            data = await asyncio.wait_for(self.connection.read_message(), rerun_timeout)
+            if data is None:
+                raise ConnectionError('The app closed the session')
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session':
+                for page in forward.new_session.app_pages:
+                    self.pages[page.page_name.replace('_', ' ')] = page.page_script_hash
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_kind = element.WhichOneof('type')
+                elements.append((element_kind, getattr(element, element_kind)))
+                if element_kind == 'exception':
+                    error = element.exception.message
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                break
+        self.elements = elements
+        return time.perf_counter() - start, error
+
+    async def step(self, action):
+        if action[0] == 'open':
+            page = next((name for name in self.pages if action[1].lower() in name.lower()), None)
+            if page is None:
+                raise LookupError(f'No page matching {action[1]!r}')
+            self.page, self.widgets = page, {}
+            return await self.rerun()
+        if action[0] == 'select':
+            _, label, option = action
+            widget = self._find(label, ('selectbox', 'radio'))
+            self.widgets[widget.id] = ('int_value', list(widget.options).index(option))
+            return await self.rerun()
+        if action[0] == 'submit':
+            return await self.rerun(trigger=self._find(action[1], ('button',)).id)
+        return await self.rerun()
+
+
+# -------- Keep one session busy with random scenarios until the deadline
+async def user_loop(url, deadline, think_time, rng, samples):
+    session = Session(url)
+    try:
+        await session.connect()
+    except Exception as error:
+        samples.append({'scenario': 'connect', 'step': 'connect', 'seconds': None,
+                        'error': f'{type(error).__name__}: {error}'})
+        return
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+    try:
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            for action in scenarios[name][1]:
+                try:
+                    seconds, error = await session.step(action)
+                except Exception as failure:
+                    seconds, error = None, f'{type(failure).__name__}: {failure}'
+                samples.append({'scenario': name, 'step': action[0], 'seconds': seconds, 'error': error})
+                if error is not None:
+                    break
+            if think_time > 0:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+    finally:
+        session.close()
+
+
+async def run_level(url, users, duration, think_time, pid, seed):
+    samples, rss_samples = [], []
+    deadline = time.monotonic() + duration
+
+    async def sample_memory():
+        while time.monotonic() < deadline:
+            rss_samples.append(process_rss(pid))
+            await asyncio.sleep(0.5)
+
+    start = time.monotonic()
+    await asyncio.gather(sample_memory(), *[
+        user_loop(url, deadline, think_time, random.Random(seed * 1000 + i), samples) for i in range(users)])
+    elapsed = time.monotonic() - start
+
+    latencies = [sample['seconds'] for sample in samples if sample['error'] is None]
+    rss_values = [value for value in rss_samples if value]
+    level = {
+        'users': users,
+        'seconds': elapsed,
+        'interactions': len(latencies),
+        'errors': sum(sample['error'] is not None for sample in samples),
+        'throughput_per_second': len(latencies) / elapsed,
+        'latency_seconds': {f'p{p}': percentile(latencies, p) for p in (50, 95, 99)},
+        'max_latency_seconds': max(latencies, default=None),
+        'rss_peak_mb': max(rss_values) / 2 ** 20 if rss_values else None,
+        'rss_end_mb': rss_values[-1] / 2 ** 20 if rss_values else None,
+        'by_scenario': {},
+        'error_examples': sorted({sample['error'] for sample in samples if sample['error']})[:5],
+    }
+    for name in scenarios:
+        scenario_latencies = [sample['seconds'] for sample in samples
+                              if sample['scenario'] == name and sample['error'] is None]
+        if scenario_latencies:
+            level['by_scenario'][name] = {'interactions': len(scenario_latencies),
+                                          'p95_seconds': percentile(scenario_latencies, 95)}
+    return level
+
+
+# -------- Launch `streamlit run app.py` on a free port and wait until it answers
+def launch_app(port=None, extra_args=()):
+    if port is None:
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+    command = [sys.executable, '-m', 'streamlit', 'run', 'app.py', '--server.headless', 'true',
+               '--server.port', str(port), '--server.address', '127.0.0.1',
+               '--browser.gatherUsageStats', 'false', *extra_args]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(120):
+        if process.poll() is not None:
+            raise RuntimeError('streamlit exited before it started serving')
+        try:
+            with urllib.request.urlopen(f'{url}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'streamlit did not start on {url}')
+
+
+def _ms(value):
+    return f'{value * 1000:>9,.0f}' if value is not None else f'{"-":>9}'
+
+
+def print_level(level):
+    latency = level['latency_seconds']
+    rss = f"{level['rss_peak_mb']:>8,.0f}" if level['rss_peak_mb'] is not None else f'{"-":>8}'
+    print(f"{level['users']:>6} {level['interactions']:>8} {level['throughput_per_second']:>8.2f} "
+          f"{_ms(latency['p50'])} {_ms(latency['p95'])} {_ms(latency['p99'])} {level['errors']:>7} {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive concurrent sessions against the Streamlit app.')
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 5, 10, 25, 50],
+                        help='Concurrency levels, run one after the other')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds per concurrency level')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause between scenarios, in seconds')
+    parser.add_argument('--url', help='Target a running app instead of launching one')
+    parser.add_argument('--pid', type=int, help='Process to measure memory of when --url is used')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Where to write the results, defaults to benchmarks/results/loadtest-<timestamp>.json')
+    args = parser.parse_args()
+
+    process = None
+    url, pid = args.url, args.pid
+    if url is None:
+        process, url = launch_app()
+        pid = process.pid
+    print(f'Load testing {url}')
+
+    levels = []
+    try:
+        print(f"{'users':>6} {'requests':>8} {'per sec':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'rss MB':>8}")
+        for users in args.users:
+            level = asyncio.run(run_level(url, users, args.duration, args.think_time, pid, args.seed))
+            levels.append(level)
+            print_level(level)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'url': url,
+            'duration': args.duration,
+            'think_time': args.think_time,
+            'scenarios': {name: weight for name, (weight, _) in scenarios.items()},
+            'cpus': os.cpu_count(),
+        },
+        'levels': levels,
+    }
+    output = args.output or os.path.join(results_dir, f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as out_file:
+        json.dump(report, out_file, indent=2)
+    print(f'Wrote {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+# Benchmark suite for inference, data loading and page rendering.
+#
+# Run from the repository root with:
+#     python -m benchmarks.run                          # every suite, results saved as JSON
+#     python -m benchmarks.run --suites inference --quick
+#     python -m benchmarks.run --save-baseline          # store the results as the baseline
+#     python -m benchmarks.run --compare                # flag regressions against the baseline
+#
+# Every measurement is the median of several timed repeats after one warm-up
+# run. Inputs come from the seeded generators in benchmarks/synthetic.py, so
+# two runs on the same machine measure the same work.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Define file paths
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+results_dir = './benchmarks/results'
+baseline_path = './benchmarks/baseline.json'
+
+suites = ['inference', 'data', 'history', 'pages']
+batch_sizes = [1, 10, 100, 1000, 10000]
+dataset_sizes = [3000, 30000, 300000]
+history_sizes = [1000, 10000, 100000]
+pages = {
+    'home': 'app.py',
+    'data_view': 'pages/0_👨‍💻_Data_View.py',
+    'dashboard': 'pages/1_📊_Dashboard.py',
+    'predict': 'pages/2_🔮_Predict.py',
+    'history': 'pages/3_🕰️_History.py',
+    'risk_index': 'pages/4_🎯_Risk_Index.py',
+    'metrics': 'pages/5_⏱️_Metrics.py',
+}
+
+# A result counts as a regression when it is this much worse than the baseline
+default_threshold = 0.10
+
+
+def measure(function, repeat=5):
+    function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def result(name, value, unit, higher_is_better=False):
+    return {'name': name, 'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+# -------- Single-row and batched scoring for every model present
+def bench_inference(quick, repeat):
+    from benchmarks.synthetic import model_frame
+    from utils.inference import available_models, get_predictor
+    from utils.transformers import feature_columns
+
+    sizes = batch_sizes[:-1] if quick else batch_sizes
+    data = model_frame(max(sizes), seed=1)
+    results = []
+    for name in available_models():
+        slug = name.lower().replace(' (approx.)', '_approx').replace(' ', '_')
+        start = time.perf_counter()
+        predictor = get_predictor(name)
+        results.append(result(f'inference.{slug}.load', time.perf_counter() - start, 's'))
+
+        record = data.iloc[0][feature_columns].to_dict()
+        results.append(result(f'inference.{slug}.single_row', measure(lambda: predictor.predict_one(record), repeat), 's'))
+        for size in sizes:
+            batch = data.iloc[:size]
+            seconds = measure(lambda: predictor.predict_frame(batch.copy()), repeat)
+            results.append(result(f'inference.{slug}.batch_{size}.rows_per_second', size / seconds, 'rows/s', True))
+    return results
+
+
+# -------- Raw csv parsing, columnar conversion and warm loads of dataset.csv at several sizes
+def bench_data(quick, repeat, workdir):
+    import pandas as pd
+    from benchmarks.synthetic import dataset_csv
+    from utils import columnar
+
+    # Keep the converted copies of the synthetic files out of data/columnar
+    default_dir = columnar.columnar_dir
+    columnar.columnar_dir = os.path.join(workdir, 'columnar')
+    try:
+        results = []
+        for size in dataset_sizes[:2] if quick else dataset_sizes:
+            path = dataset_csv(size, os.path.join(workdir, f'dataset_{size}.csv'), seed=2)
+            results.append(result(f'data.dataset_{size}.read_csv', measure(lambda: pd.read_csv(path), repeat), 's'))
+
+            def convert():
+                for suffix in ('', '.json'):
+                    stored = columnar.columnar_path(path) + suffix
+                    if os.path.exists(stored):
+                        os.remove(stored)
+                columnar.ensure_columnar(path)
+            results.append(result(f'data.dataset_{size}.convert', measure(convert, repeat), 's'))
+            results.append(result(f'data.dataset_{size}.load_frame', measure(lambda: columnar.load_frame(path), repeat), 's'))
+        return results
+    finally:
+        columnar.columnar_dir = default_dir
+
+
+# -------- Counting and paging through prediction history at several sizes
+def bench_history(quick, repeat, workdir):
+    from benchmarks.synthetic import history_frame
+    from utils.history import HistoryStore
+
+    results = []
+    for size in history_sizes[:2] if quick else history_sizes:
+        store = HistoryStore(os.path.join(workdir, f'history_{size}.db'))
+        data = history_frame(size, seed=3)
+        start = time.perf_counter()
+        for offset in range(0, size, 10000):
+            store.append(data.iloc[offset:offset + 10000])
+        results.append(result(f'history.rows_{size}.append', time.perf_counter() - start, 's'))
+
+        customer = data['customerID'].iloc[size // 2][:4]
+        results.append(result(f'history.rows_{size}.count', measure(store.count, repeat), 's'))
+        results.append(result(f'history.rows_{size}.first_page', measure(lambda: store.fetch_page(limit=50), repeat), 's'))
+        results.append(result(f'history.rows_{size}.last_page',
+                              measure(lambda: store.fetch_page(limit=50, offset=size - 50), repeat), 's'))
+        results.append(result(f'history.rows_{size}.customer_filter',
+                              measure(lambda: store.fetch_page(limit=50, customer_id=customer), repeat), 's'))
+    return results
+
+
+# -------- Full script runs of each page in Streamlit's headless test harness
+def bench_pages(quick, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    results = []
+    for name, path in pages.items():
+        def run():
+            # AppTest resolves relative paths against this file's directory, not the working directory
+            app = AppTest.from_file(os.path.join(repo_root, path), default_timeout=120)
+            app.run()
+            if app.exception:
+                raise RuntimeError(f'{path} raised {app.exception[0].message}')
+        results.append(result(f'pages.{name}.run', measure(run, 1 if quick else repeat), 's'))
+    return results
+
+
+def run_suites(selected, quick, repeat):
+    results = []
+    with tempfile.TemporaryDirectory(prefix='churn-bench-') as workdir:
+        for suite in selected:
+            print(f'Running {suite} benchmarks...')
+            if suite == 'inference':
+                results += bench_inference(quick, repeat)
+            elif suite == 'data':
+                results += bench_data(quick, repeat, workdir)
+            elif suite == 'history':
+                results += bench_history(quick, repeat, workdir)
+            elif suite == 'pages':
+                results += bench_pages(quick, repeat)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -------- Compare with a stored run; returns the rows that got worse by more than the threshold
+def compare(results, baseline, threshold=default_threshold):
+    previous = {row['name']: row for row in baseline['results']}
+    rows = []
+    for row in results:
+        before = previous.get(row['name'])
+        if before is None or before['value'] == 0:
+            continue
+        change = row['value'] / before['value'] - 1
+        worse = -change if row['higher_is_better'] else change
+        rows.append(dict(row, baseline=before['value'], change=change, regression=worse > threshold))
+    return rows
+
+
+def print_comparison(rows):
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:<60} {row['baseline']:>14.6g} -> {row['value']:>14.6g} {row['unit']:<7} "
+              f"{row['change']:>+8.1%} {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark inference, data loading and page rendering.')
+    parser.add_argument('--suites', nargs='+', default=suites, choices=suites)
+    parser.add_argument('--quick', action='store_true', help='Skip the largest sizes and repeat pages once')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repeats per measurement')
+    parser.add_argument('--output', help='Where to write the results, defaults to benchmarks/results/<timestamp>.json')
+    parser.add_argument('--save-baseline', action='store_true', help='Also store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare the results with the stored baseline')
+    parser.add_argument('--baseline', default=baseline_path)
+    parser.add_argument('--threshold', type=float, default=default_threshold,
+                        help='Relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = run_suites(args.suites, args.quick, args.repeat)
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'quick': args.quick,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    output = args.output or os.path.join(results_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as out_file:
+        json.dump(report, out_file, indent=2)
+    print(f'Wrote {output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as out_file:
+            json.dump(report, out_file, indent=2)
+        print(f'Stored the baseline in {args.baseline}')
+
+    if args.compare:
+        with open(args.baseline) as baseline_file:
+            rows = compare(results, json.load(baseline_file), args.threshold)
+        print_comparison(rows)
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            print(f'{len(regressions)} regression(s) above {args.threshold:.0%}')
+            sys.exit(1)
+        print('No regressions')
+    else:
+        for row in results:
+            print(f"{row['name']:<60} {row['value']:>14.6g} {row['unit']}")
+
+
+if __name__ == '__main__':
+    main()
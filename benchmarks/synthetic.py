@@ -0,0 +1,73 @@
+# Synthetic data for the benchmarks, scaled up from the real files.
+#
+# Rows are resampled from the real data with replacement and the numeric
+# columns are jittered, so value distributions, blanks and spellings match
+# what the app sees while the row count can be made as large as needed.
+# Every generator is seeded, so the same arguments give the same data.
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils.columnar import load_frame
+from utils.ingest import to_model_frame
+
+# Define file paths
+dataset_path = './data/dataset.csv'
+training_data_path = './data/cleaned_merged.csv'
+
+# First day of the 90 days of generated prediction history
+history_start = datetime(2024, 1, 1)
+
+
+def _customer_ids(rng, n):
+    digits = rng.integers(0, 10000, n)
+    letters = rng.integers(0, 26, (n, 5)) + ord('A')
+    suffixes = [bytes(row).decode('ascii') for row in letters.astype(np.uint8)]
+    return [f'{d:04d}-{s}' for d, s in zip(digits, suffixes)]
+
+
+def _jitter(rng, values, scale, low=0.0):
+    numeric = pd.to_numeric(values, errors='coerce')
+    jittered = numeric * rng.normal(1.0, scale, len(numeric))
+    return jittered.clip(lower=low)
+
+
+# -------- Model input rows, in the raw form the pipelines were trained on
+def model_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    source = to_model_frame(load_frame(training_data_path))
+    data = source.iloc[rng.integers(0, len(source), rows)].reset_index(drop=True)
+    data['customerID'] = _customer_ids(rng, rows)
+    data['tenure'] = _jitter(rng, data['tenure'], 0.1).round()
+    data['MonthlyCharges'] = _jitter(rng, data['MonthlyCharges'], 0.05).round(2)
+    data['TotalCharges'] = _jitter(rng, data['TotalCharges'], 0.05).round(2)
+    return data
+
+
+# -------- A copy of dataset.csv with the given number of rows, written to path
+def dataset_csv(rows, path, seed=0, chunk_rows=100000):
+    rng = np.random.default_rng(seed)
+    source = pd.read_csv(dataset_path, dtype=str, keep_default_na=False)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='') as out_file:
+        for start in range(0, rows, chunk_rows):
+            n = min(chunk_rows, rows - start)
+            chunk = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+            chunk['customerID'] = _customer_ids(rng, n)
+            chunk['tenure'] = _jitter(rng, chunk['tenure'], 0.1).round().astype('Int64').astype(str)
+            for column in ('MonthlyCharges', 'TotalCharges'):
+                # Blank TotalCharges stay blank, as in the real file
+                chunk[column] = _jitter(rng, chunk[column], 0.05).round(2).astype(str).replace('nan', '')
+            chunk.to_csv(out_file, header=(start == 0), index=False)
+    return path
+
+
+# -------- Prediction history rows spread over 90 days from a fixed date
+def history_frame(rows, seed=0, models=('Gradient Boosting', 'Support Vector')):
+    rng = np.random.default_rng(seed)
+    data = model_frame(rows, seed)
+    data['Churn'] = np.where(rng.random(rows) < 0.27, 'Yes', 'No')
+    data['Model'] = np.asarray(models)[rng.integers(0, len(models), rows)]
+    seconds = np.sort(rng.integers(0, 90 * 24 * 3600, rows))
+    data['timestamp'] = [(history_start + timedelta(seconds=int(s))).isoformat(timespec='seconds') for s in seconds]
+    return data
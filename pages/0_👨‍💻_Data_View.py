@@ -1,6 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
+import math
+from utils.columnar import column_groups, open_table, read_page
+
+dataset_path = './data/dataset.csv'
 
 # Configure the page
 st.set_page_config(
@@ -28,26 +30,31 @@ def data_page():
         option = st.selectbox('Choose columns to be viewed',
                               ('All Columns', 'Numeric Columns', 'Categorical Columns'))
 
-    # ---- Load remote dataset
-    @st.cache_data(show_spinner='Loading data')
-    def load_data():
-        df = pd.read_csv('C:\\Users\\HP ELITEBOOK 830 G5\\OneDrive\\Desktop\\Home Office\\Azubi Project\\GUI-Machine-Learning-App\\data\\dataset.csv')
-        return df
+    # ---- Open the columnar copy of the dataset; only the visible page is read from it
+    table = open_table(dataset_path)
+    total_rows = table.num_rows
+
+    cols = st.columns(4)
+    with cols[0]:
+        page_size = st.selectbox('Rows per page', options=[50, 100, 500, 1000], index=1)
+    with cols[1]:
+        total_pages = max(math.ceil(total_rows / page_size), 1)
+        page = st.number_input(f'Page (of {total_pages:,})', min_value=1, max_value=total_pages, value=1)
 
-    df = load_data().head(100)
+    offset = (page - 1) * page_size
+    columns = column_groups(table).get(option)
 
     # Display based on selection
     if option == 'Numeric Columns':
         st.subheader('Numeric Columns')
-        st.write(df.select_dtypes(include='number'))
-
     elif option == 'Categorical Columns':
         st.subheader('Categorical Columns')
-        st.write(df.select_dtypes(include='object'))
-
     else:
         st.subheader('Complete Dataset')
-        st.write(df)
+
+    df = read_page(table, offset, page_size, columns)
+    st.write(df)
+    st.caption(f'Showing rows {offset + 1:,}–{offset + len(df):,} of {total_rows:,}')
 
     # ----- Add column descriptions of the dataset
     with st.expander('**Click to view column description**'):
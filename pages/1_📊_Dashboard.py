@@ -1,7 +1,16 @@
 import streamlit as st
-import plotly.express as px
 import pandas as pd
-import streamlit_shadcn_ui as ui
+from utils.aggregates import dashboard_from_partials, eda_from_partials
+from utils.columnar import load_frame
+from utils.drift import drift_monitor, psi_thresholds
+from utils.fingerprint import file_fingerprint
+from utils.incremental import file_version, refresh
+from utils.metrics import timer
+
+dataset_path = './data/dataset.csv'
+
+# Above this many rows the EDA charts are binned on the server by default
+large_dataset_rows = 50000
 
 # Configure the page
 st.set_page_config(
@@ -26,104 +35,144 @@ def dashboard_page():
     # ------ Set visualization view page
     col1, col2, col3 = st.columns(3)
     with col2:
-        options = st.selectbox('Choose viz to display', options=['', 'EDA Dashboard', 'KPIs Dashboard'])
+        options = st.selectbox('Choose viz to display', options=['', 'EDA Dashboard', 'KPIs Dashboard', 'Drift Monitor'])
 
     # ------ Load Dataset from remote location
+    # The fingerprint changes whenever the file does, so a new dataset is picked up on the next rerun
     @st.cache_data(show_spinner='Loading data')
-    def load_data():
-        df = pd.read_csv('./data/dataset.csv')
+    def load_data(fingerprint):
+        df = load_frame(dataset_path)
         return df
 
-    df = load_data()
+    # The aggregates are refreshed from the rows appended since the last refresh and
+    # derived from stored partials, so only the small results stay cached
+    @st.cache_data(show_spinner='Computing aggregates')
+    def load_aggregates(version):
+        with timer('dashboard_aggregates'):
+            return dashboard_from_partials(refresh(dataset_path)['grouped'])
+
+    @st.cache_data(show_spinner='Binning data')
+    def load_eda_aggregates(version, bins):
+        with timer('eda_aggregates'):
+            state = refresh(dataset_path)
+            return eda_from_partials(state['grouped'], state['eda'], bins)
+
+    # Size and mtime only; appending rows changes it without hashing the whole file
+    version = file_version(dataset_path)
+
+    def refresh_caption():
+        state = refresh(dataset_path)
+        st.caption(f"{state['rows']:,} rows · last refresh read {state['delta_rows']:,} new rows")
+
+    # ------ Show a chart along with the size of the data sent to the browser
+    def show_chart(fig):
+        st.plotly_chart(fig)
+        st.caption(f'Chart payload: {len(fig.to_json()) / 1024:,.1f} KB')
+
+    def histogram_fig(bins, title, x_label):
+        fig = go.Figure(go.Bar(x=bins['center'], y=bins['count'], width=bins['right'] - bins['left']))
+        fig.update_layout(title=title, xaxis_title=x_label, yaxis_title='count', bargap=0)
+        return fig
 
     def eda_viz():
         st.subheader('EDA Dashboard')
+        row_count = refresh(dataset_path)['rows']
+        server_side = st.toggle('Aggregate charts on the server', value=row_count > large_dataset_rows,
+                                help='Bin and summarise the data before sending it to the browser')
         column1, column2 = st.columns(2)
+
+        if server_side:
+            bins = st.select_slider('Histogram bins', options=[20, 50, 100, 200], value=50)
+            aggregates = load_eda_aggregates(version, bins)
+            refresh_caption()
+            with column1:
+                show_chart(histogram_fig(aggregates['tenure'], 'Distribution of Tenure', 'tenure'))
+            with column1:
+                show_chart(histogram_fig(aggregates['MonthlyCharges'], 'Distribution of MonthlyCharges', 'MonthlyCharges'))
+            with column1:
+                show_chart(histogram_fig(aggregates['TotalCharges'], 'Distribution of TotalCharges', 'TotalCharges'))
+
+            with column2:
+                fig = px.bar(aggregates['Churn'], x='Churn', y='count', title='Churn Distribution')
+                show_chart(fig)
+            with column2:
+                stats = aggregates['TotalCharges_by_gender']
+                fig = go.Figure(go.Box(x=stats['gender'], q1=stats['q1'], median=stats['median'], q3=stats['q3'],
+                                       lowerfence=stats['lowerfence'], upperfence=stats['upperfence'],
+                                       mean=stats['mean'], name='TotalCharges'))
+                fig.update_layout(title='Total Charges Distribution across Gender', xaxis_title='gender', yaxis_title='TotalCharges')
+                show_chart(fig)
+            return
+
+        df = load_data(file_fingerprint(dataset_path))
         with column1:
             fig = px.histogram(df, x='tenure', title='Distribution of Tenure')
-            st.plotly_chart(fig)
+            show_chart(fig)
         with column1:
             fig = px.histogram(df, x='MonthlyCharges', title='Distribution of MonthlyCharges')
-            st.plotly_chart(fig)
+            show_chart(fig)
         with column1:
             fig = px.histogram(df, x='TotalCharges', title='Distribution of TotalCharges')
-            st.plotly_chart(fig)
+            show_chart(fig)
 
         with column2:
             fig = px.bar(df, x='Churn', title='Churn Distribution')
-            st.plotly_chart(fig)
+            show_chart(fig)
         with column2:
             fig = px.box(df, x='gender', y='TotalCharges', title='Total Charges Distribution across Gender')
-            st.plotly_chart(fig)
+            show_chart(fig)
 
-    def kpi_viz():
+    def kpi_viz(aggregates):
+        kpis = aggregates['kpis']
         st.subheader('KPIs Dashboard')
         st.markdown('---')
         cols = st.columns(5)
         st.markdown('---')
         # ------- Grand Total Charges
         with cols[0]:
-            grand_tc = df['TotalCharges'].sum()
+            grand_tc = kpis['grand_total_charges']
             ui.metric_card(title="Grand TotalCharges", content=f"{'{:,.2f}'.format(grand_tc)}", key="card1")
 
         # ------- Grand Monthly Charges
         with cols[1]:
-            grand_mc = df['MonthlyCharges'].sum()
+            grand_mc = kpis['grand_monthly_charges']
             ui.metric_card(title="Grand MonthlyCharges", content=f"{'{:,.2f}'.format(grand_mc)}", key="card2")
 
         # ------- Average Customer Tenure
         with cols[2]:
-            average_tenure = df['tenure'].mean()
+            average_tenure = kpis['average_tenure']
             ui.metric_card(title="Average Tenure", content=f"{'{:,.2f}'.format(average_tenure)}", key="card3")
 
         # ------- Churned Customers
         with cols[3]:
-            churned = len(df.loc[df['Churn'] == 1])
+            churned = kpis['churned']
             ui.metric_card(title="Churn", content=f"{churned}", key="card4")
 
         # ------ Total Customers
         with cols[4]:
-            total_customers = df['customerID'].count()
+            total_customers = kpis['total_customers']
             ui.metric_card(title="Total Customers", content=f"{total_customers}", key="card5")
 
-    def analytical_ques_viz():
+    def analytical_ques_viz(aggregates):
         # ------ Answer Analytical Question 1
-        mal_churned_customers = df[(df['gender']=='Male') & (df['Dependents']== 1) & (df['Churn']== 1)]['PaymentMethod'].value_counts()
-
-        values = mal_churned_customers.values
-        labels = mal_churned_customers.index
-
-        treemap_df = pd.DataFrame({'labels': labels, 'values': values})
-
-        fig = px.treemap(treemap_df, path=['labels'], values='values', color='values',
+        fig = px.treemap(aggregates['q1'], path=['labels'], values='values', color='values',
                          color_continuous_scale='Blues', title='Q1. How many male customers with dependents churned given their payment method?')
         st.plotly_chart(fig)
 
         # ------ Answer Analytical Question 2
-        fem_churned_customers = df[(df['gender']=='Female') & (df['Dependents']== 1) & (df['Churn']== 1)]['PaymentMethod'].value_counts()
-
-        values = fem_churned_customers.values
-        labels = fem_churned_customers.index
-
-        treemap_df = pd.DataFrame({'labels': labels, 'values': values})
-
-        fig = px.treemap(treemap_df, path=['labels'], values='values', color='values',
+        fig = px.treemap(aggregates['q2'], path=['labels'], values='values', color='values',
                          color_continuous_scale='Blues', title='Q2. How many female customers with dependents churned given their payment method?')
         st.plotly_chart(fig)
 
         # ------ Answer Analytical Question 3
-        churned = df[df['Churn'] == 1]
-
-        fig = px.bar(churned, x='MultipleLines', color='gender', barmode='group',
+        fig = px.bar(aggregates['q3'], x='MultipleLines', y='count', color='gender', barmode='group',
                      title='Q3. What is the distribution for the customers who churned given their multiple lines status?',
-                     labels={'MultipleLines': 'Multiple Lines', 'gender': 'Gender'})
+                     labels={'MultipleLines': 'Multiple Lines', 'gender': 'Gender', 'count': 'Customers'})
 
         st.plotly_chart(fig)
 
         # ------ Answer Analytical Question 4
-        monthly_charges = df.groupby('gender')['MonthlyCharges'].sum().reset_index()
-
-        fig = px.pie(monthly_charges, names='gender', values='MonthlyCharges',
+        fig = px.pie(aggregates['q4'], names='gender', values='MonthlyCharges',
                      title='Q4. What percentage of MonthlyCharges was accumulated given the customer gender?',
                      color='gender',
                      labels={'gender': 'Gender', 'MonthlyCharges': 'Monthly Charges'})
@@ -132,20 +181,60 @@ def dashboard_page():
         st.plotly_chart(fig)
 
         # ------ Answer Analytical Question 5
-        monthly_charges = df.groupby('Churn')['TotalCharges'].sum().reset_index()
-
-        fig = px.pie(monthly_charges, names='Churn', values='TotalCharges',
+        fig = px.pie(aggregates['q5'], names='Churn', values='TotalCharges',
                      title='Q5. What percentage of TotalCharges was accumulated given customer churn status?',
                      color='Churn',
                      labels={'Churn': 'Churn', 'TotalCharges': 'Monthly Charges'})
 
         st.plotly_chart(fig)
 
+    def drift_viz():
+        st.subheader('Drift Monitor')
+        report = drift_monitor.report()
+        st.caption(f"{report['rows']:,} predictions recorded since {report['since']}, compared with "
+                   f"{report['baseline_rows']:,} training rows. PSI below {psi_thresholds[0]} is stable, "
+                   f"above {psi_thresholds[1]} is a significant shift. Churn compares predicted churn with the training churn rate.")
+        if report['rows'] == 0:
+            st.markdown('#### No predictions recorded yet')
+            return
+
+        features = report['features'].sort_values('psi', ascending=False, na_position='last')
+        fig = px.bar(features, x='feature', y='psi', color='status', title='Population Stability Index by feature',
+                     color_discrete_map={'Stable': 'seagreen', 'Moderate': 'orange', 'Significant': 'crimson'})
+        for threshold in psi_thresholds:
+            fig.add_hline(y=threshold, line_dash='dot')
+        st.plotly_chart(fig)
+        st.dataframe(features, hide_index=True, use_container_width=True)
+
+        feature = st.selectbox('Compare distributions', options=features['feature'].tolist())
+        distribution = drift_monitor.distribution(feature).melt(id_vars='bin', var_name='source', value_name='share')
+        fig = px.bar(distribution, x='bin', y='share', color='source', barmode='group',
+                     title=f'{feature}: training baseline vs recorded predictions')
+        st.plotly_chart(fig)
+
+        if st.button('Reset drift statistics', help='Start counting recorded predictions from zero'):
+            drift_monitor.reset()
+            st.rerun()
+
+    # ------ Charting libraries are only imported once a view is chosen
+    if options:
+        import plotly.express as px
+        import plotly.graph_objects as go
+    if options == 'KPIs Dashboard':
+        import streamlit_shadcn_ui as ui
+
     if options == 'EDA Dashboard':
-        eda_viz()
+        with timer('render_eda_dashboard'):
+            eda_viz()
     elif options == 'KPIs Dashboard':
-        kpi_viz()
-        analytical_ques_viz()
+        with timer('render_kpis_dashboard'):
+            aggregates = load_aggregates(version)
+            refresh_caption()
+            kpi_viz(aggregates)
+            analytical_ques_viz(aggregates)
+    elif options == 'Drift Monitor':
+        with timer('render_drift_monitor'):
+            drift_viz()
     else:
         st.markdown('#### No viz display selected yet')
 
@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.base import BaseEstimator, TransformerMixin
 from io import BytesIO
-import joblib
 import os
+import time
+import uuid
+from utils.inference import available_models, get_predictor, predict_all
+from utils.history import get_history_writer
+from utils.metrics import timer
+from utils.prediction_cache import prediction_cache
+from utils.sweep import axis_values, numeric_ranges, sweep_features, sweep_frame
+from utils.transformers import feature_columns
 
 # Configure the page
 st.set_page_config(
@@ -23,80 +29,38 @@ st.title("Predict Customer Churn!")
 
 column1, column2 = st.columns([.6, .4])
 with column1:
-    model_option = st.selectbox('Choose which model to use for prediction', options=['Gradient Boosting', 'Support Vector'])
+    model_option = st.selectbox('Choose which model to use for prediction', options=available_models())
+    if model_option == 'Support Vector (approx.)':
+        from utils.approx_svm import load_report
+        report = load_report()
+        if report is not None:
+            st.caption(f"Approximate engine: agrees with the exact Support Vector model on {report['agreement']:.1%} of "
+                       f"{report['holdout_rows']:,} holdout customers · accuracy {report['approx']['accuracy']:.3f} vs "
+                       f"{report['exact']['accuracy']:.3f} · calibration error {report['approx']['calibration_error']:.3f} vs "
+                       f"{report['exact']['calibration_error']:.3f} · "
+                       f"{report['approx']['rows_per_second'] / report['exact']['rows_per_second']:.0f}x faster")
+with column2:
+    prediction_mode = st.radio('Prediction mode', options=['Single Customer', 'Compare Models', 'What-if Sweep', 'Bulk Upload'], horizontal=True)
 
 # Define file paths
-local_model1_path = 'model/GradientBoosting.joblib'
-local_model2_path = 'model/SupportVector.joblib'
-local_encoder_path = 'model/label_encoder.joblib'
-
-# -------- Function to load the model from local files
-@st.cache_resource(show_spinner="Loading model")
-def gb_pipeline():
-    model = joblib.load(local_model1_path)
-    return model
-
-@st.cache_resource(show_spinner="Loading model")
-def sv_pipeline():
-    model = joblib.load(local_model2_path)
-    return model
-
-# --------- Function to load encoder from local files
-def load_encoder():
-    encoder = joblib.load(local_encoder_path)
-    return encoder
-
-# --------- Create a function for model selection
-def select_model():
-    if model_option == 'Gradient Boosting':
-        model = gb_pipeline()
-    else:  # Ensure 'Support Vector' is handled correctly
-        model = sv_pipeline()
-    encoder = load_encoder()
-    return model, encoder
-
-# Custom function to deal with cleaning the total charges column
-class TotalCharges_cleaner(BaseEstimator, TransformerMixin):
-    def fit(self, X, y=None):
-        return self
-        
-    def transform(self, X):
-        # Replace empty string with NA
-        X['TotalCharges'].replace(' ', np.nan, inplace=True)
-        # Convert the values in the TotalCharges column to a float
-        X['TotalCharges'] = X['TotalCharges'].astype(float)
-        return X
-        
-    def __getstate__(self):
-        return {}
+batch_output_dir = './data/batch'
 
-    def __setstate__(self, state):
-        pass
-        
-    def get_feature_names_out(self, input_features=None):
-        return input_features
-
-# Create a class to deal with dropping Customer ID from the dataset
-class columnDropper(BaseEstimator, TransformerMixin):
-    def fit(self, X, y=None):
-        return self
-        
-    def transform(self, X):
-        return X.drop('customerID', axis=1)
-        
-    def get_feature_names_out(self, input_features=None):
-        if input_features is None:
-            return None
-        return [feature for feature in input_features if feature != 'customerID']
+# --------- Load the predictor for the selected model
+def select_model():
+    with st.spinner('Loading model'):
+        predictor = get_predictor(model_option)
+    return predictor
 
 # Initialize prediction in session state
 if 'prediction' not in st.session_state:
     st.session_state['prediction'] = None
 if 'prediction_proba' not in st.session_state:
     st.session_state['prediction_proba'] = None
+if 'explanation' not in st.session_state:
+    st.session_state['explanation'] = None
 
-# ------- Create a function to make prediction
-def make_prediction(model, encoder):
+# ------- Build the model input from the submitted form
+def build_features():
     customerID = st.session_state['customer_id']
     gender = st.session_state['gender']
     SeniorCitizen = st.session_state['senior_citizen']
@@ -117,42 +81,196 @@ def make_prediction(model, encoder):
     PaymentMethod = st.session_state['payment_method']
     MonthlyCharges = st.session_state['monthly_charges']
     TotalCharges = st.session_state['total_charges']
-        
-    columns = ['customerID', 'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure',
-                'PhoneService', 'MultipleLines', 'InternetService', 'OnlineSecurity', 'OnlineBackup',
-                'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies',
-                'Contract', 'PaperlessBilling', 'PaymentMethod', 'MonthlyCharges', 'TotalCharges']
-        
+
     values = [[customerID, gender, SeniorCitizen, Partner, Dependents, tenure, PhoneService,
             MultipleLines, InternetService, OnlineSecurity, OnlineBackup, DeviceProtection,
             TechSupport, StreamingTV, StreamingMovies, Contract, PaperlessBilling,
             PaymentMethod, MonthlyCharges, TotalCharges]]
         
-    data = pd.DataFrame(values, columns=columns)
+    return pd.DataFrame(values, columns=feature_columns)
 
-    # Get the value for prediction
-    prediction = model.predict(data)
-    prediction = encoder.inverse_transform(prediction)
-    st.session_state['prediction'] = prediction
+# ------- Create a function to make prediction
+def make_prediction(predictor):
+    with timer('build_features'):
+        data = build_features()
 
-    # Get the value for prediction probability
-    prediction_proba = model.predict_proba(data)
+    # Repeat customers are answered from the cache instead of running the pipeline again
+    record = data.iloc[0].to_dict()
+    label, proba = prediction_cache.predict_one(predictor, record)
+    st.session_state['explanation'] = prediction_cache.explain_one(predictor, record)[1] if predictor.can_explain else None
+    prediction = np.array([label])
+    prediction_proba = np.array([proba])
+    st.session_state['prediction'] = prediction
     st.session_state['prediction_proba'] = prediction_proba
 
     data['Churn'] = prediction
     data['Model'] = model_option
 
-    if not os.path.exists('./data'):
-        os.makedirs('./data')
-        
-    data.to_csv('./data/history.csv', mode='a', header=not os.path.exists('./data/history.csv'), index=False)
+    save_history(data)
 
     return prediction, prediction_proba
 
+# ------- Score the submitted customer with every model at the same time
+def compare_predictions():
+    with timer('build_features'):
+        data = build_features()
+
+    start = time.perf_counter()
+    with st.spinner('Scoring with every model'):
+        results = predict_all(data)
+    wall_time = time.perf_counter() - start
+
+    rows, history = [], []
+    for name, prediction, prediction_proba, elapsed in results:
+        rows.append({
+            'Model': name,
+            'Prediction': prediction[0],
+            'Churn probability': round(float(prediction_proba[0][1]), 4),
+            'Inference time (ms)': round(elapsed * 1000, 2),
+        })
+        history.append(data.assign(Churn=prediction, Model=name))
+
+    # All models' results go to history together
+    save_history(pd.concat(history, ignore_index=True))
+    st.session_state['comparison'] = (pd.DataFrame(rows), wall_time)
+
+# ------- Vary one or two features of the submitted customer and score the whole grid at once
+def sensitivity_sweep(predictor):
+    base = st.session_state.get('sweep_base')
+    if base is None:
+        st.markdown('##### Submit a customer to explore how their churn probability responds to each feature.')
+        return
+
+    cols = st.columns(3)
+    with cols[0]:
+        features = st.multiselect('Features to vary (one or two)', options=sweep_features,
+                                  default=['tenure'], max_selections=2)
+    with cols[1]:
+        points = st.slider('Grid points per numeric feature', min_value=10, max_value=100, value=50)
+    if not features:
+        return
+
+    axes = {}
+    for i, feature in enumerate(features):
+        if feature in numeric_ranges:
+            low, high = numeric_ranges[feature]
+            with cols[2]:
+                low, high = st.slider(f'{feature} range', min_value=float(low), max_value=float(high),
+                                      value=(float(low), float(high)), key=f'sweep_range_{feature}')
+            axes[feature] = axis_values(feature, points, low, high)
+        else:
+            axes[feature] = axis_values(feature, points)
+
+    import plotly.express as px
+
+    start = time.perf_counter()
+    data, shape = sweep_frame(base, axes)
+    _, prediction_proba = predictor.predict_frame(data)
+    churn = prediction_proba[:, 1].reshape(shape)
+    elapsed = time.perf_counter() - start
+
+    if len(features) == 1:
+        feature = features[0]
+        curve = pd.DataFrame({feature: axes[feature], 'Churn probability': churn})
+        if feature in numeric_ranges:
+            fig = px.line(curve, x=feature, y='Churn probability', title=f'Churn probability by {feature}')
+        else:
+            fig = px.bar(curve, x=feature, y='Churn probability', title=f'Churn probability by {feature}')
+        fig.update_yaxes(range=[0, 1])
+    else:
+        fig = px.imshow(churn, x=[str(v) for v in axes[features[1]]], y=[str(v) for v in axes[features[0]]],
+                        labels={'x': features[1], 'y': features[0], 'color': 'Churn probability'},
+                        color_continuous_scale='RdYlGn_r', aspect='auto', origin='lower',
+                        title=f'Churn probability by {features[0]} and {features[1]}')
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f'Scored {len(data):,} what-if customers in {elapsed * 1000:,.1f} ms with {predictor.name}')
+
+# ------- Show the features that moved the prediction the most
+def show_drivers(explanation, top=5):
+    import plotly.express as px
+
+    drivers = explanation.reindex(explanation.abs().sort_values(ascending=False).index[:top])
+    drivers = drivers.iloc[::-1].rename('Contribution').rename_axis('Feature').reset_index()
+    drivers['Effect'] = np.where(drivers['Contribution'] > 0, 'Towards churn', 'Away from churn')
+    fig = px.bar(drivers, x='Contribution', y='Feature', color='Effect', orientation='h',
+                 color_discrete_map={'Towards churn': '#d62728', 'Away from churn': '#2ca02c'},
+                 title='Top drivers of this prediction')
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption('Contributions are in log-odds of churn, summed over every split the customer passes through in the boosted trees.')
+
+# ------- Queue predictions for the background history writer
+def save_history(data):
+    with timer('history_submit'):
+        get_history_writer().submit(data)
+
+# ------- Score an uploaded csv file chunk by chunk
+def bulk_prediction():
+    predictor = select_model()
+
+    uploaded_file = st.file_uploader('Upload a csv file with the customers to score', type='csv')
+    chunk_size = st.select_slider('Rows scored per batch', options=[1000, 5000, 10000, 50000], value=10000)
+
+    if uploaded_file is not None and st.button('Score file'):
+        os.makedirs(batch_output_dir, exist_ok=True)
+        download_name = f'{os.path.splitext(uploaded_file.name)[0]}_scored.csv'
+        # Unique per run so sessions scoring files with the same name do not share an output file
+        output_path = os.path.join(batch_output_dir, f'{uuid.uuid4().hex}_{download_name}')
+
+        progress = st.progress(0.0, text='Scoring customers...')
+        scored_rows = 0
+        missing_columns = []
+
+        # Only one chunk is held in memory at a time, results go straight to disk
+        try:
+            with open(output_path, 'w', newline='') as output_file:
+                chunks = pd.read_csv(uploaded_file, chunksize=chunk_size, dtype={'customerID': str})
+                for i, chunk in enumerate(chunks):
+                    missing_columns = [column for column in feature_columns if column not in chunk.columns]
+                    if missing_columns:
+                        break
+
+                    data = chunk[feature_columns].copy()
+
+                    # Score the whole chunk as a single batch
+                    with timer('bulk_chunk', model_option):
+                        prediction, prediction_proba = predictor.predict_frame(data)
+
+                    data['Churn'] = prediction
+                    data['Model'] = model_option
+                    save_history(data)
+
+                    data['Probability'] = prediction_proba.max(axis=1)
+                    data.to_csv(output_file, header=(i == 0), index=False)
+
+                    scored_rows += len(data)
+                    progress.progress(min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0),
+                                      text=f'Scored {scored_rows:,} customers')
+        except BaseException:
+            os.remove(output_path)
+            raise
+
+        if missing_columns:
+            # Do not leave the rows scored before the bad chunk behind
+            os.remove(output_path)
+            progress.empty()
+            st.error(f"Uploaded file is missing the columns: {', '.join(missing_columns)}")
+            return
+
+        progress.progress(1.0, text=f'Scored {scored_rows:,} customers')
+        st.session_state['batch_output'] = (output_path, download_name)
+
+    # Keep the download available across reruns
+    output_path, download_name = st.session_state.get('batch_output', (None, None))
+    if output_path is not None and os.path.exists(output_path):
+        st.success('Churn status predicted successfully🎉')
+        with open(output_path, 'rb') as output_file:
+            st.download_button('Download scored file', data=output_file,
+                               file_name=download_name, mime='text/csv')
+
 # ------- Prediction page creation
 def input_features():
     with st.form('features'):
-        model_pipeline, encoder = select_model()
+        predictor = select_model()
         col1, col2 = st.columns(2)
 
         # ------ Collect customer information
@@ -213,12 +331,44 @@ def input_features():
             st.session_state['total_charges'] = total_charges
             
             # Make the prediction
-            make_prediction(model_pipeline, encoder)
+            if prediction_mode == 'Compare Models':
+                compare_predictions()
+            elif prediction_mode == 'What-if Sweep':
+                st.session_state['sweep_base'] = build_features()
+            else:
+                # End to end, from the submitted form to the queued history row
+                with timer('prediction', model_option):
+                    make_prediction(predictor)
 
     return True
 
 if __name__ == '__main__':
+    if prediction_mode == 'Bulk Upload':
+        bulk_prediction()
+        st.stop()
+
     input_features()
+
+    if prediction_mode == 'What-if Sweep':
+        sensitivity_sweep(select_model())
+        st.stop()
+
+    if prediction_mode == 'Compare Models':
+        comparison = st.session_state.get('comparison')
+        if comparison is None:
+            st.markdown('##### Submit a customer to compare the predictions of every model.')
+        else:
+            results, wall_time = comparison
+            st.dataframe(results, use_container_width=True, hide_index=True)
+            st.caption(f"Wall-clock time {wall_time * 1000:,.1f} ms for all models "
+                       f"(sum of model times {results['Inference time (ms)'].sum():,.1f} ms)")
+        st.stop()
+
+    cache_stats = prediction_cache.stats()
+    st.caption(f"Prediction cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+               f"{cache_stats['hit_rate']:.0%} of predictions served from cache · "
+               f"explanations {cache_stats['explanation_hits']} hits · {cache_stats['explanation_misses']} misses · "
+               f"{cache_stats['size']}/{cache_stats['maxsize']} entries")
     
     prediction = st.session_state['prediction']
     probability = st.session_state['prediction_proba']    
@@ -244,4 +394,9 @@ if __name__ == '__main__':
                 st.markdown(f'### The customer will not churn with a {round(probability[0][0], 2)} probability.')
             cols = st.columns([.3, .4, .3])
             with cols[1]:
-                st.success('Churn status predicted successfully🎉')
\ No newline at end of file
+                st.success('Churn status predicted successfully🎉')
+
+        if st.session_state['explanation'] is not None:
+            cols = st.columns([.2, .6, .2])
+            with cols[1]:
+                show_drivers(st.session_state['explanation'])
\ No newline at end of file
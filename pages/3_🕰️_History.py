@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import os  # Import os module to check file existence
+import math
+from utils.history import get_history_writer, history_store, sortable_columns
 
 # Configure the page
 st.set_page_config(
@@ -19,12 +20,50 @@ def history_page():
     # Set header for page
     st.title('History')
 
-    # Check if the file exists before attempting to load it
-    if os.path.exists('./data/history.csv'):
-        data = pd.read_csv('./data/history.csv')
-        st.dataframe(data)
-    else:
+    # Make sure predictions still queued in this process are visible
+    get_history_writer().flush()
+
+    # ------ Filters are applied by the database, only the visible page is fetched
+    cols = st.columns(4)
+    with cols[0]:
+        customer_id = st.text_input('Customer ID starts with', value='', placeholder='eg. 1234-ABCDE')
+    with cols[1]:
+        models = st.multiselect('Model', options=history_store.models())
+    with cols[2]:
+        churn = st.selectbox('Churn', options=['All', 'Yes', 'No'])
+    with cols[3]:
+        dates = st.date_input('Date range', value=())
+
+    filters = {
+        'customer_id': customer_id.strip() or None,
+        'models': models,
+        'churn': None if churn == 'All' else churn,
+    }
+    if len(dates) == 2:
+        filters['start'] = dates[0].isoformat()
+        filters['end'] = (pd.Timestamp(dates[1]) + pd.Timedelta(days=1)).date().isoformat()
+
+    total_rows = history_store.count(**filters)
+    if total_rows == 0:
         st.write("No history data available.")
+        return
+
+    cols = st.columns(4)
+    with cols[0]:
+        sort_by = st.selectbox('Sort by', options=sortable_columns)
+    with cols[1]:
+        descending = st.radio('Order', options=['Descending', 'Ascending'], horizontal=True) == 'Descending'
+    with cols[2]:
+        page_size = st.selectbox('Rows per page', options=[25, 50, 100, 500], index=1)
+    with cols[3]:
+        total_pages = max(math.ceil(total_rows / page_size), 1)
+        page = st.number_input(f'Page (of {total_pages:,})', min_value=1, max_value=total_pages, value=1)
+
+    offset = (page - 1) * page_size
+    data = history_store.fetch_page(limit=page_size, offset=offset, sort_by=sort_by,
+                                    descending=descending, **filters)
+    st.dataframe(data, use_container_width=True, hide_index=True)
+    st.caption(f'Showing {offset + 1:,}–{offset + len(data):,} of {total_rows:,} predictions')
 
 if __name__ == '__main__':
-    history_page()
\ No newline at end of file
+    history_page()
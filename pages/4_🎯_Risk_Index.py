@@ -0,0 +1,71 @@
+import streamlit as st
+import pandas as pd
+import time
+from utils.inference import available_models
+from utils.risk_index import index_info, job_status, load_index, query, start_background_build
+
+# Configure the page
+st.set_page_config(
+    page_title='Risk Index',
+    page_icon='🎯',
+    layout='wide'
+)
+
+# --------- Add custom CSS to adjust the width of the sidebar
+st.markdown(""" 
+    <style> 
+        section[data-testid="stSidebar"] { width: 200px !important; }
+    </style> """, unsafe_allow_html=True)
+
+def risk_index_page():
+    # Set header for page
+    st.title('Churn Risk Index')
+
+    column1, column2 = st.columns([.6, .4])
+    with column1:
+        model_option = st.selectbox('Model used to score the customer base', options=available_models())
+
+    # ------ Index status and background rebuild
+    with column2:
+        info = index_info(model_option)
+        if info is not None:
+            st.caption(f"Index built {info['built_at']} · {info['customers']:,} customers · "
+                       f"{info['rescored']:,} scored in the last run")
+        if st.button('Refresh index', help='Scores new and changed customers in the background'):
+            start_background_build(model_option)
+
+    job = job_status(model_option)
+    if job is not None and job['status'] == 'running':
+        st.progress(job['progress'], text='Scoring customers in the background...')
+        time.sleep(1)
+        st.rerun()
+    elif job is not None and job['status'] == 'failed':
+        st.error(f"Index refresh failed: {job['error']}")
+
+    index = load_index(model_option)
+    if index is None:
+        st.markdown('##### No risk index yet. Refresh the index to score every customer.')
+        return
+
+    # ------ Queries are answered from the stored, sorted index
+    cols = st.columns(5)
+    with cols[0]:
+        top_n = st.number_input('Top N customers', min_value=1, max_value=len(index), value=min(500, len(index)))
+    with cols[1]:
+        min_percentile = st.slider('Minimum risk percentile', min_value=0, max_value=100, value=0)
+    segments = {}
+    for col, column in zip(cols[2:], ['Contract', 'InternetService', 'PaymentMethod']):
+        with col:
+            options = [value for value in index[column].dropna().unique()]
+            segments[column] = st.multiselect(column, options=sorted(options, key=str))
+
+    results = query(index, top_n=top_n, min_percentile=min_percentile, segments=segments)
+    st.dataframe(results.drop(columns=['row_hash']), use_container_width=True, hide_index=True,
+                 column_config={'churn_probability': st.column_config.ProgressColumn(
+                     'Churn probability', min_value=0.0, max_value=1.0, format='%.3f')})
+    st.caption(f'{len(results):,} customers shown')
+    st.download_button('Download results', data=results.drop(columns=['row_hash']).to_csv(index=False),
+                       file_name='churn_risk.csv', mime='text/csv')
+
+if __name__ == '__main__':
+    risk_index_page()
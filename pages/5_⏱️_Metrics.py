@@ -0,0 +1,63 @@
+import streamlit as st
+import pandas as pd
+from utils.metrics import enabled, percentiles, registry, window_size
+
+# Configure the page
+st.set_page_config(
+    page_title='Metrics',
+    page_icon='⏱️',
+    layout='wide'
+)
+
+# --------- Add custom CSS to adjust the width of the sidebar
+st.markdown(""" 
+    <style> 
+        section[data-testid="stSidebar"] { width: 200px !important; }
+    </style> """, unsafe_allow_html=True)
+
+def metrics_page():
+    # Set header for page
+    st.title('Metrics')
+
+    if not enabled:
+        st.markdown('#### Latency recording is turned off (CHURN_METRICS=0)')
+        return
+
+    st.caption(f'Time spent in each stage since this process started. Percentiles cover the last '
+               f'{window_size:,} samples of each stage and model.')
+
+    snapshot = pd.DataFrame(registry.snapshot())
+    if snapshot.empty:
+        st.markdown('#### No timings recorded yet, make a prediction or open the dashboard first')
+        return
+
+    # ------ Filter by model; stages that do not belong to a model are listed as "shared"
+    snapshot['model'] = snapshot['model'].replace('', 'shared')
+    models = st.multiselect('Model', options=sorted(snapshot['model'].unique()))
+    if models:
+        snapshot = snapshot[snapshot['model'].isin(models)]
+
+    st.dataframe(snapshot.round(3), hide_index=True, use_container_width=True)
+
+    import plotly.express as px
+
+    long = snapshot.melt(id_vars=['stage', 'model'], value_vars=[f'p{p}_ms' for p in percentiles],
+                         var_name='percentile', value_name='ms')
+    long['stage'] = long['stage'] + ' · ' + long['model']
+    fig = px.bar(long, x='ms', y='stage', color='percentile', barmode='group', orientation='h',
+                 title='Latency percentiles by stage', log_x=True)
+    fig.update_layout(height=max(400, 30 * snapshot.shape[0]))
+    st.plotly_chart(fig, use_container_width=True)
+
+    # ------ The same numbers in the Prometheus text format
+    with st.expander('Prometheus export'):
+        text = registry.prometheus_text()
+        st.code(text, language='text')
+        st.download_button('Download metrics', data=text, file_name='metrics.txt', mime='text/plain')
+
+    if st.button('Reset metrics'):
+        registry.reset()
+        st.rerun()
+
+if __name__ == '__main__':
+    metrics_page()
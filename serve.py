@@ -0,0 +1,204 @@
+# Headless scoring service for the churn models.
+#
+# Run with:
+#     python serve.py --port 8502 --max-batch-size 256 --max-wait-ms 5
+#
+# POST /predict?model=gradient_boosting with a JSON record, a list of records
+# or {"records": [...]}. Concurrent requests are queued and scored together
+# in micro-batches with a single pass through the pipeline per batch.
+# GET /metrics returns per-stage latencies in the Prometheus text format.
+# Every batch is scored with the model's current predictor, so a version
+# published under model/versions/LATEST is served without a restart.
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from utils.inference import available_models, get_predictor
+from utils.metrics import registry, timer
+from utils.transformers import feature_columns
+
+
+# -------- Collects queued requests and scores them as one batch
+class MicroBatcher:
+    def __init__(self, name, max_batch_size=256, max_wait=0.005):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, records):
+        future = Future()
+        self.requests.put((records, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            batch_rows = len(batch[0][0])
+
+            # Keep collecting until the batch is full or the oldest request has waited long enough
+            deadline = time.monotonic() + self.max_wait
+            while batch_rows < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                batch_rows += len(item[0])
+
+            try:
+                self._score(batch)
+            except Exception:
+                # Score requests one by one so a single bad record only fails its own request
+                for item in batch:
+                    try:
+                        self._score([item])
+                    except Exception as error:
+                        item[1].set_exception(error)
+
+    def _score(self, batch):
+        records = [record for request_records, _ in batch for record in request_records]
+        data = pd.DataFrame(records, columns=feature_columns)
+
+        # Looked up per batch: a cheap stat call, and a reload once a new version is published
+        predictor = get_predictor(self.name)
+        with timer('batch_score', self.name):
+            prediction, prediction_proba = predictor.predict_frame(data)
+
+        start = 0
+        for request_records, future in batch:
+            end = start + len(request_records)
+            future.set_result([
+                {
+                    'customerID': records[i]['customerID'],
+                    'Churn': str(prediction[i]),
+                    'probability': float(prediction_proba[i].max()),
+                }
+                for i in range(start, end)
+            ])
+            start = end
+
+
+# -------- Threaded server with a listen backlog sized for many concurrent clients;
+# the default of 5 resets connections that arrive while the accept queue is full
+class ScoringServer(ThreadingHTTPServer):
+    def __init__(self, address, handler, backlog=128):
+        self.request_queue_size = backlog
+        super().__init__(address, handler)
+
+
+def make_handler(batchers, timeout):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == '/health':
+                self._send_json(200, {'status': 'ok', 'models': sorted(batchers)})
+            elif path == '/metrics':
+                body = registry.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != '/predict':
+                self._send_json(404, {'error': 'not found'})
+                return
+
+            model_name = parse_qs(url.query).get('model', ['gradient_boosting'])[0]
+            if model_name not in batchers:
+                self._send_json(400, {'error': f'unknown model {model_name!r}, choose from {sorted(batchers)}'})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'null')
+            except ValueError:
+                self._send_json(400, {'error': 'request body must be valid JSON'})
+                return
+
+            if isinstance(payload, dict) and 'records' in payload:
+                records = payload['records']
+            elif isinstance(payload, dict):
+                records = [payload]
+            else:
+                records = payload
+
+            if not isinstance(records, list) or not records or not all(isinstance(r, dict) for r in records):
+                self._send_json(400, {'error': 'expected a record, a list of records or {"records": [...]}'})
+                return
+
+            missing_columns = sorted({column for record in records for column in feature_columns if column not in record})
+            if missing_columns:
+                self._send_json(400, {'error': f"missing columns: {', '.join(missing_columns)}"})
+                return
+
+            future = batchers[model_name].submit(records)
+            try:
+                with timer('request', batchers[model_name].name):
+                    predictions = future.result(timeout=timeout)
+            except Exception as error:
+                self._send_json(500, {'error': str(error)})
+                return
+
+            self._send_json(200, {'model': model_name, 'predictions': predictions})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the churn models over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--max-batch-size', type=int, default=256, help='Maximum rows scored in one call')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='Maximum time a request waits for a batch to fill')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a queued request gives up')
+    parser.add_argument('--backlog', type=int, default=128, help='Connections the listening socket queues')
+    args = parser.parse_args()
+
+    # Load the pipelines and encoder up front; they stay cached until a new version is published
+    batchers = {}
+    for name in available_models():
+        get_predictor(name)
+        slug = name.lower().replace(' (approx.)', '_approx').replace(' ', '_')
+        batchers[slug] = MicroBatcher(name, args.max_batch_size, args.max_wait_ms / 1000)
+
+    server = ScoringServer((args.host, args.port), make_handler(batchers, args.timeout), args.backlog)
+    print(f'Serving churn models on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# Scoring with every model loaded from the host-wide, memory-mapped copies.
+#
+# Run from the repository root with:
+#     python -m pytest tests
+import os
+import numpy as np
+import pytest
+from utils import inference, shared_models
+from utils.warmup import sample_record
+
+models = ['Gradient Boosting', 'Support Vector']
+
+
+@pytest.fixture
+def shared_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_models, 'enabled', True)
+    monkeypatch.setattr(shared_models, 'shared_dir', str(tmp_path))
+    # Start from an empty cache so every model is loaded in shared mode
+    monkeypatch.setattr(inference, '_predictors', {})
+
+
+@pytest.mark.parametrize('name', models)
+def test_predicts_in_shared_mode(shared_mode, name):
+    if not os.path.exists(inference.resolve_path(name)):
+        pytest.skip(f'{name} model is not present')
+    predictor = inference.get_predictor(name)
+    prediction, prediction_proba = predictor.predict_one(sample_record)
+    assert prediction in ('Yes', 'No')
+    assert prediction_proba.sum() == pytest.approx(1.0)
+
+    # Same answer as the private, unmapped pipeline
+    expected, expected_proba = inference.Predictor(name, inference.load_pipeline(inference.resolve_path(name)),
+                                                   inference.load_encoder()).predict_one(sample_record)
+    assert prediction == expected
+    np.testing.assert_allclose(prediction_proba, expected_proba, rtol=0, atol=1e-9)
@@ -0,0 +1,52 @@
+# Parity of the compiled Gradient Boosting model with the shipped pipeline.
+#
+# Run from the repository root with:
+#     python -m pytest tests
+import os
+import numpy as np
+import pytest
+from utils.columnar import load_frame
+from utils.fingerprint import file_fingerprint
+from utils.ingest import to_model_frame
+from utils.transformers import load_pipeline
+from utils.tree_export import CompiledGradientBoosting, export, local_model_path, parity_data_path
+
+pytestmark = pytest.mark.skipif(not (os.path.exists(local_model_path) and os.path.exists(parity_data_path)),
+                                reason='needs the shipped model and data/cleaned_merged.csv')
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    return load_pipeline(local_model_path)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return to_model_frame(load_frame(parity_data_path))
+
+
+@pytest.fixture(scope='module')
+def compiled(pipeline):
+    return CompiledGradientBoosting.from_pipeline(pipeline, file_fingerprint(local_model_path))
+
+
+def test_predict_proba_matches_pipeline(pipeline, compiled, data):
+    expected = pipeline.predict_proba(data.copy())
+    actual = compiled.predict_proba(data)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_contributions_add_up_to_decision_function(compiled, data):
+    sample = data.iloc[:1000]
+    bias, contributions = compiled.contributions(sample)
+    np.testing.assert_allclose(bias + contributions.sum(axis=1).to_numpy(), compiled.decision_function(sample),
+                               rtol=0, atol=1e-9)
+
+
+def test_export_round_trip(tmp_path, compiled, data):
+    output_path = str(tmp_path / 'GradientBoosting.compiled.joblib')
+    export(local_model_path, output_path)
+    loaded = CompiledGradientBoosting.load(output_path, mmap_mode='r')
+    assert loaded.source_fingerprint == file_fingerprint(local_model_path)
+    np.testing.assert_array_equal(loaded.predict_proba(data), compiled.predict_proba(data))
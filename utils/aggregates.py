@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+# Every KPI card and analytical question slices the data on these columns
+group_columns = ['gender', 'Dependents', 'Churn', 'PaymentMethod', 'MultipleLines']
+
+
+# Width of the fixed bins the EDA partials count numeric values into
+fine_bin_widths = {'tenure': 1.0, 'MonthlyCharges': 0.25, 'TotalCharges': 5.0}
+
+
+# -------- Reduce rows to the group sums and counts the dashboard is derived from.
+# Every column is a sum or a count, so partials of separate chunks can be merged.
+def group_partials(df):
+    # Charges are stored as float32; sum them as float64 rounded back to the cents of the
+    # csv, so the totals stay exact however many partials are merged
+    df = df.assign(**{column: df[column].astype('float64').round(2) for column in ('MonthlyCharges', 'TotalCharges')})
+    return df.groupby(group_columns, dropna=False, observed=True).agg(
+        rows=('gender', 'size'),
+        customers=('customerID', 'count'),
+        tenure_sum=('tenure', 'sum'),
+        tenure_count=('tenure', 'count'),
+        monthly_charges=('MonthlyCharges', 'sum'),
+        total_charges=('TotalCharges', 'sum'),
+    ).reset_index()
+
+
+def merge_group_partials(grouped, other):
+    combined = pd.concat([grouped, other], ignore_index=True)
+    return combined.groupby(group_columns, dropna=False, observed=True).sum().reset_index()
+
+
+# -------- Every KPI card and analytical question table, derived from the few dozen
+# rows of group partials
+def dashboard_from_partials(grouped):
+    churned = grouped['Churn'].eq(1).fillna(False).astype(bool)
+    with_dependents = grouped['Dependents'].eq(1).fillna(False).astype(bool)
+
+    kpis = {
+        'grand_total_charges': grouped['total_charges'].sum(),
+        'grand_monthly_charges': grouped['monthly_charges'].sum(),
+        'average_tenure': grouped['tenure_sum'].sum() / grouped['tenure_count'].sum(),
+        'churned': int(grouped.loc[churned, 'rows'].sum()),
+        'total_customers': int(grouped['customers'].sum()),
+    }
+
+    def churned_by_payment_method(gender):
+        subset = grouped[(grouped['gender'] == gender) & with_dependents & churned]
+        counts = subset.groupby('PaymentMethod', observed=True)['rows'].sum().sort_values(ascending=False)
+        counts = counts[counts > 0]
+        return pd.DataFrame({'labels': counts.index, 'values': counts.values})
+
+    multiple_lines = (grouped[churned]
+                      .groupby(['MultipleLines', 'gender'], dropna=False, observed=True)['rows'].sum()
+                      .reset_index(name='count'))
+    multiple_lines['MultipleLines'] = multiple_lines['MultipleLines'].astype(str)
+
+    return {
+        'kpis': kpis,
+        'q1': churned_by_payment_method('Male'),
+        'q2': churned_by_payment_method('Female'),
+        'q3': multiple_lines,
+        'q4': grouped.groupby('gender', observed=True)['monthly_charges'].sum().reset_index(name='MonthlyCharges'),
+        'q5': (grouped.assign(Churn=churn_labels(grouped['Churn']))
+               .groupby('Churn')['total_charges'].sum().reset_index(name='TotalCharges')),
+    }
+
+
+# Churn is stored as a 0/1 flag; show it as Yes/No on the charts
+def churn_labels(series):
+    return series.map({1: 'Yes', 0: 'No'})
+
+
+# -------- Counts of a numeric column in fixed-width bins, plus exact min, max, sum and count
+def numeric_partial(series, width):
+    values = pd.to_numeric(series, errors='coerce').dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return {'bins': pd.Series(dtype='int64'), 'min': np.inf, 'max': -np.inf, 'sum': 0.0, 'count': 0}
+    return {
+        'bins': pd.Series(np.floor(values / width).astype(np.int64)).value_counts().sort_index(),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'sum': float(values.sum()),
+        'count': int(len(values)),
+    }
+
+
+def merge_numeric_partials(partial, other):
+    return {
+        'bins': partial['bins'].add(other['bins'], fill_value=0).astype('int64'),
+        'min': min(partial['min'], other['min']),
+        'max': max(partial['max'], other['max']),
+        'sum': partial['sum'] + other['sum'],
+        'count': partial['count'] + other['count'],
+    }
+
+
+# -------- Everything the EDA charts need, as mergeable partials
+def eda_partials(df):
+    return {
+        'numeric': {column: numeric_partial(df[column], width) for column, width in fine_bin_widths.items()},
+        'TotalCharges_by_gender': {str(gender): numeric_partial(values, fine_bin_widths['TotalCharges'])
+                                   for gender, values in df.groupby('gender', observed=True)['TotalCharges']},
+    }
+
+
+def merge_eda_partials(partials, other):
+    by_gender = dict(partials['TotalCharges_by_gender'])
+    for gender, partial in other['TotalCharges_by_gender'].items():
+        by_gender[gender] = merge_numeric_partials(by_gender[gender], partial) if gender in by_gender else partial
+    return {
+        'numeric': {column: merge_numeric_partials(partials['numeric'][column], other['numeric'][column])
+                    for column in fine_bin_widths},
+        'TotalCharges_by_gender': by_gender,
+    }
+
+
+# -------- Regroup the fixed bins into equal-width chart bins over the observed range
+def histogram_from_partial(partial, width, bins=50):
+    low, high = partial['min'], partial['max']
+    if partial['count'] == 0:
+        edges = np.linspace(0, 1, bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+    else:
+        edges = np.linspace(low, high if high > low else low + width, bins + 1)
+        # Each fixed bin is placed by its center, clipped to the observed range
+        centers = np.clip((partial['bins'].index.to_numpy() + 0.5) * width, low, high)
+        which = np.clip(np.searchsorted(edges, centers, side='right') - 1, 0, bins - 1)
+        counts = np.bincount(which, weights=partial['bins'].to_numpy(), minlength=bins).astype(np.int64)
+    return pd.DataFrame({
+        'left': edges[:-1],
+        'right': edges[1:],
+        'center': (edges[:-1] + edges[1:]) / 2,
+        'count': counts,
+    })
+
+
+def _binned_quantile(partial, width, q):
+    counts = partial['bins'].to_numpy()
+    cumulative = np.cumsum(counts)
+    target = q * partial['count']
+    b = min(int(np.searchsorted(cumulative, target)), len(counts) - 1)
+    before = cumulative[b - 1] if b > 0 else 0
+    left = partial['bins'].index[b] * width
+    value = left + (target - before) / counts[b] * width
+    return float(np.clip(value, partial['min'], partial['max']))
+
+
+def box_stats_from_partials(partials, by, width):
+    rows = []
+    for group, partial in partials.items():
+        if partial['count'] == 0:
+            continue
+        q1, median, q3 = (_binned_quantile(partial, width, q) for q in (.25, .5, .75))
+        iqr = q3 - q1
+        rows.append({
+            by: group,
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': max(q1 - 1.5 * iqr, partial['min']),
+            'upperfence': min(q3 + 1.5 * iqr, partial['max']),
+            'mean': partial['sum'] / partial['count'],
+        })
+    return pd.DataFrame(rows)
+
+
+# -------- The EDA chart data from partials; within one fixed bin width of the exact figures
+def eda_from_partials(grouped, partials, bins=50):
+    churn = grouped.assign(Churn=churn_labels(grouped['Churn']).astype(str)).groupby('Churn')['rows'].sum()
+    return {
+        **{column: histogram_from_partial(partials['numeric'][column], width, bins)
+           for column, width in fine_bin_widths.items()},
+        'Churn': pd.DataFrame({'Churn': churn.index, 'count': churn.values}),
+        'TotalCharges_by_gender': box_stats_from_partials(partials['TotalCharges_by_gender'], 'gender',
+                                                          fine_bin_widths['TotalCharges']),
+    }
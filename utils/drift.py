@@ -0,0 +1,280 @@
+# Streaming drift monitor for the inputs recorded in the prediction history.
+#
+# Baselines are computed once from data/cleaned_merged.csv: numeric features
+# are split into bins at the training quantiles and categorical features into
+# their known levels. Every batch the history writer stores is counted into
+# the same bins, so an update costs a constant amount of work per row and the
+# history is never read back. The counts are added up in a SQLite database
+# shared by every process that records predictions. PSI and KS scores compare
+# the live counts with the training proportions.
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.columnar import load_frame
+from utils.fingerprint import file_fingerprint
+from utils.ingest import category_levels, flag_columns, normalize_chunk, schema_columns
+
+# Define file paths
+baseline_data_path = './data/cleaned_merged.csv'
+drift_dir = './data/drift'
+baseline_path = os.path.join(drift_dir, 'baseline.json')
+state_path = os.path.join(drift_dir, 'state.db')
+
+numeric_features = ['tenure', 'MonthlyCharges', 'TotalCharges']
+categorical_features = ['gender', 'SeniorCitizen', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
+                        'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport',
+                        'StreamingTV', 'StreamingMovies', 'Contract', 'PaperlessBilling', 'PaymentMethod', 'Churn']
+flag_levels = ['No', 'Yes']
+
+# Quantiles of the training data used as bin edges for the numeric features
+baseline_quantiles = np.linspace(0.05, 0.95, 19)
+
+# Usual PSI reading: below 0.1 stable, up to 0.25 moderate shift, above that significant
+psi_thresholds = (0.1, 0.25)
+_epsilon = 1e-4
+
+
+def _atomic_write(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as out_file:
+        json.dump(payload, out_file)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as in_file:
+            return json.load(in_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _levels(feature):
+    return flag_levels if feature in flag_columns else category_levels[feature]
+
+
+# -------- Bin the typed rows of a batch; returns per-feature count arrays and missing counts
+def _bin_counts(df, baseline):
+    counts, missing = {}, {}
+    for feature in numeric_features:
+        values = df[feature].to_numpy(dtype='float64', na_value=np.nan)
+        present = ~np.isnan(values)
+        edges = np.asarray(baseline['numeric'][feature]['edges'])
+        bins = np.searchsorted(edges, values[present], side='right')
+        counts[feature] = np.bincount(bins, minlength=len(edges) + 1)
+        missing[feature] = int((~present).sum())
+    for feature in categorical_features:
+        column = df[feature]
+        if feature in flag_columns:
+            codes = column.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            codes = pd.Categorical(column, categories=_levels(feature)).codes.astype('float64')
+            codes[codes < 0] = np.nan
+        present = ~np.isnan(codes)
+        counts[feature] = np.bincount(codes[present].astype(np.int64), minlength=len(_levels(feature)))
+        missing[feature] = int((~present).sum())
+    return counts, missing
+
+
+# -------- Training distribution of every monitored feature
+def compute_baseline(path=baseline_data_path):
+    df = load_frame(path)
+    baseline = {'fingerprint': file_fingerprint(path), 'rows': int(len(df)), 'numeric': {}, 'categorical': {}}
+    for feature in numeric_features:
+        values = df[feature].dropna().to_numpy(dtype='float64')
+        baseline['numeric'][feature] = {
+            'edges': np.unique(np.quantile(values, baseline_quantiles)).tolist(),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+    counts, _ = _bin_counts(df, baseline)
+    for feature in numeric_features:
+        baseline['numeric'][feature]['proportions'] = (counts[feature] / counts[feature].sum()).tolist()
+    for feature in categorical_features:
+        baseline['categorical'][feature] = {
+            'levels': _levels(feature),
+            'proportions': (counts[feature] / max(counts[feature].sum(), 1)).tolist(),
+        }
+    return baseline
+
+
+def load_baseline(path=baseline_data_path):
+    baseline = _read_json(baseline_path)
+    if baseline is None or baseline.get('fingerprint') != file_fingerprint(path):
+        baseline = compute_baseline(path)
+        _atomic_write(baseline_path, baseline)
+    return baseline
+
+
+# -------- Drift scores between two distributions over the same bins
+def psi(expected, actual):
+    expected = np.clip(np.asarray(expected, dtype=float), _epsilon, None)
+    actual = np.clip(np.asarray(actual, dtype=float), _epsilon, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(expected, actual):
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+
+def drift_status(score):
+    if score < psi_thresholds[0]:
+        return 'Stable'
+    if score < psi_thresholds[1]:
+        return 'Moderate'
+    return 'Significant'
+
+
+# -------- Approximate a quantile from binned counts, interpolating inside the bin
+def binned_quantile(counts, edges, low, high, q):
+    total = counts.sum()
+    if total == 0:
+        return None
+    bounds = np.concatenate([[low], edges, [high]])
+    cumulative = np.cumsum(counts)
+    target = q * total
+    b = min(int(np.searchsorted(cumulative, target)), len(counts) - 1)
+    before = cumulative[b - 1] if b > 0 else 0
+    share = (target - before) / counts[b] if counts[b] else 0.0
+    return float(bounds[b] + share * (bounds[b + 1] - bounds[b]))
+
+
+# -------- Running per-feature counts, updated as predictions are recorded.
+# The counts live in a SQLite database and every update adds to them in one
+# transaction, so several app processes can record into the same totals.
+class DriftMonitor:
+    def __init__(self, path=state_path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._baseline = None
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = load_baseline()
+            if not self._initialized:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with self._connect() as connection:
+                    # Counts are kept per baseline: counts made against other bin edges cannot be compared.
+                    # Bin -1 counts the rows where the feature is missing
+                    connection.execute('CREATE TABLE IF NOT EXISTS counts (baseline TEXT, feature TEXT, bin INTEGER, '
+                                       'count INTEGER, PRIMARY KEY (baseline, feature, bin))')
+                    connection.execute('CREATE TABLE IF NOT EXISTS runs (baseline TEXT PRIMARY KEY, since TEXT, rows INTEGER)')
+                self._initialized = True
+            return self._baseline
+
+    def _start_run(self, connection, fingerprint):
+        connection.execute('INSERT OR IGNORE INTO runs (baseline, since, rows) VALUES (?, ?, 0)',
+                           (fingerprint, datetime.now().isoformat(timespec='seconds')))
+
+    # -------- Stored counts for the current baseline, as arrays over the baseline bins
+    def _read_state(self, baseline):
+        fingerprint = baseline['fingerprint']
+        sizes = {feature: len(baseline['numeric'][feature]['edges']) + 1 for feature in numeric_features}
+        sizes.update({feature: len(baseline['categorical'][feature]['levels']) for feature in categorical_features})
+        counts = {feature: np.zeros(size, dtype=np.int64) for feature, size in sizes.items()}
+        missing = {feature: 0 for feature in sizes}
+        with self._connect() as connection:
+            self._start_run(connection, fingerprint)
+            since, rows = connection.execute('SELECT since, rows FROM runs WHERE baseline = ?', (fingerprint,)).fetchone()
+            for feature, b, count in connection.execute('SELECT feature, bin, count FROM counts WHERE baseline = ?',
+                                                        (fingerprint,)):
+                if b < 0:
+                    missing[feature] = count
+                elif feature in counts and b < len(counts[feature]):
+                    counts[feature][b] = count
+        return {'since': since, 'rows': rows, 'counts': counts, 'missing': missing}
+
+    def update(self, data):
+        # History rows hold the raw answers the models were given; bring them into the typed schema first
+        raw = data.reindex(columns=[column for column in schema_columns if column in data.columns])
+        raw = raw.astype(object).where(raw.notna(), '').astype(str)
+        typed = normalize_chunk(raw)
+        baseline = self._ensure_loaded()
+        counts, missing = _bin_counts(typed, baseline)
+        fingerprint = baseline['fingerprint']
+        deltas = [(fingerprint, feature, int(b), int(count))
+                  for feature, values in counts.items() for b, count in enumerate(values) if count]
+        deltas += [(fingerprint, feature, -1, count) for feature, count in missing.items() if count]
+        with self._connect() as connection:
+            self._start_run(connection, fingerprint)
+            connection.execute('UPDATE runs SET rows = rows + ? WHERE baseline = ?', (len(typed), fingerprint))
+            connection.executemany('INSERT INTO counts (baseline, feature, bin, count) VALUES (?, ?, ?, ?) '
+                                   'ON CONFLICT (baseline, feature, bin) DO UPDATE SET count = count + excluded.count',
+                                   deltas)
+
+    def reset(self):
+        with self._lock:
+            self._baseline = None
+        fingerprint = self._ensure_loaded()['fingerprint']
+        with self._connect() as connection:
+            connection.execute('DELETE FROM counts')
+            connection.execute('DELETE FROM runs')
+            self._start_run(connection, fingerprint)
+
+    # -------- One row per feature with its drift scores against the baseline
+    def report(self):
+        baseline = self._ensure_loaded()
+        state = self._read_state(baseline)
+        rows = []
+        for feature in numeric_features + categorical_features:
+            kind = 'numeric' if feature in numeric_features else 'categorical'
+            expected = np.asarray(baseline[kind][feature]['proportions'])
+            observed = state['counts'][feature]
+            total = observed.sum()
+            actual = observed / total if total else np.zeros_like(expected)
+            row = {
+                'feature': feature,
+                'type': kind,
+                'rows': int(total),
+                'missing': state['missing'][feature],
+                'psi': psi(expected, actual) if total else None,
+                'ks': ks(expected, actual) if total and kind == 'numeric' else None,
+            }
+            row['status'] = drift_status(row['psi']) if row['psi'] is not None else 'No data'
+            if kind == 'numeric':
+                spec = baseline['numeric'][feature]
+                row['live_median'] = binned_quantile(observed, spec['edges'], spec['min'], spec['max'], 0.5)
+                row['baseline_median'] = binned_quantile(expected, spec['edges'], spec['min'], spec['max'], 0.5)
+            rows.append(row)
+        return {'since': state['since'], 'rows': state['rows'], 'baseline_rows': baseline['rows'],
+                'features': pd.DataFrame(rows)}
+
+    # -------- Baseline and live proportions of one feature, for plotting
+    def distribution(self, feature):
+        baseline = self._ensure_loaded()
+        observed = self._read_state(baseline)['counts'][feature]
+        if feature in numeric_features:
+            spec = baseline['numeric'][feature]
+            bounds = [spec['min']] + spec['edges'] + [spec['max']]
+            labels = [f'{bounds[i]:,.1f} – {bounds[i + 1]:,.1f}' for i in range(len(bounds) - 1)]
+        else:
+            spec = baseline['categorical'][feature]
+            labels = spec['levels']
+        total = observed.sum()
+        return pd.DataFrame({
+            'bin': labels,
+            'baseline': spec['proportions'],
+            'live': observed / total if total else np.zeros(len(labels)),
+        })
+
+
+# Shared by every session in the process
+drift_monitor = DriftMonitor()
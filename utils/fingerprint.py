@@ -0,0 +1,25 @@
+import hashlib
+import os
+import threading
+
+_hashes = {}
+_lock = threading.Lock()
+
+
+# -------- Identify the contents of a file by size, mtime and a content hash.
+# The hash is only recomputed when the size or mtime changes, so calling this
+# on every rerun costs a single stat call.
+def file_fingerprint(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        digest = _hashes.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with _lock:
+            _hashes[key] = digest
+    return f'{stat.st_size}-{stat.st_mtime_ns}-{digest[:16]}'
@@ -0,0 +1,270 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+from utils.drift import drift_monitor
+from utils.fingerprint import file_fingerprint
+from utils.metrics import timer
+from utils.transformers import feature_columns
+
+# Define file paths
+history_db_path = './data/history.db'
+legacy_history_path = './data/history.csv'
+
+history_columns = ['timestamp'] + feature_columns + ['Churn', 'Model']
+column_types = {
+    'SeniorCitizen': 'INTEGER',
+    'tenure': 'INTEGER',
+    'MonthlyCharges': 'REAL',
+    'TotalCharges': 'REAL',
+}
+sortable_columns = ['timestamp', 'customerID', 'Model', 'Churn', 'tenure', 'MonthlyCharges', 'TotalCharges']
+
+
+# -------- Prediction history kept in an indexed SQLite database
+class HistoryStore:
+    def __init__(self, path=history_db_path, legacy_path=None):
+        self.path = path
+        # csv file written by earlier versions, imported into this store once
+        self.legacy_path = legacy_path
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            # Write-ahead logging lets readers page through history while predictions are written
+            connection.execute('PRAGMA journal_mode=WAL')
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            columns = ', '.join(f'"{column}" {column_types.get(column, "TEXT")}' for column in history_columns)
+            with self._connect() as connection:
+                connection.execute(f'CREATE TABLE IF NOT EXISTS history (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})')
+                connection.execute('CREATE INDEX IF NOT EXISTS idx_history_customer ON history ("customerID")')
+                connection.execute('CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history ("timestamp")')
+                connection.execute('CREATE INDEX IF NOT EXISTS idx_history_model ON history ("Model", "timestamp")')
+            self._migrate_legacy_csv()
+            self._initialized = True
+
+    def _migrate_legacy_csv(self):
+        # Earlier versions appended predictions to a csv file; import it once.
+        # The import is one write transaction that also records the file, so a
+        # second process waits for the first and then finds it already done
+        if self.legacy_path is None or not os.path.exists(self.legacy_path):
+            return
+        columns = ', '.join(f'"{column}"' for column in history_columns)
+        placeholders = ', '.join('?' for _ in history_columns)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('CREATE TABLE IF NOT EXISTS migrations (source TEXT PRIMARY KEY)')
+            source = file_fingerprint(self.legacy_path) if os.path.exists(self.legacy_path) else None
+            done = source is None or connection.execute(
+                'SELECT 1 FROM migrations WHERE source = ?', (source,)).fetchone() is not None
+            if not done:
+                for chunk in pd.read_csv(self.legacy_path, chunksize=10000, dtype={'customerID': str}):
+                    data = self._prepare(chunk).astype(object)
+                    rows = data.where(data.notna(), None).itertuples(index=False, name=None)
+                    connection.executemany(f'INSERT INTO history ({columns}) VALUES ({placeholders})', rows)
+                connection.execute('INSERT INTO migrations (source) VALUES (?)', (source,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
+        try:
+            os.replace(self.legacy_path, self.legacy_path + '.migrated')
+        except FileNotFoundError:
+            # Another process moved it first
+            pass
+
+    def _prepare(self, data):
+        data = data.reindex(columns=history_columns)
+        for column in ('MonthlyCharges', 'TotalCharges'):
+            data[column] = pd.to_numeric(data[column], errors='coerce')
+        return data
+
+    def _insert(self, data):
+        data = self._prepare(data)
+        with self._connect() as connection:
+            data.to_sql('history', connection, if_exists='append', index=False)
+
+    def append(self, data):
+        self._ensure_schema()
+        data = data.copy()
+        if 'timestamp' not in data.columns:
+            data['timestamp'] = datetime.now().isoformat(timespec='seconds')
+        self._insert(data)
+
+    def _where(self, customer_id=None, models=None, churn=None, start=None, end=None):
+        clauses, params = [], []
+        if customer_id:
+            # Prefix match written as a range so the customerID index is used
+            clauses.append('"customerID" >= ? AND "customerID" < ?')
+            params += [customer_id, customer_id + '\uffff']
+        if models:
+            clauses.append(f'"Model" IN ({", ".join("?" for _ in models)})')
+            params += list(models)
+        if churn:
+            clauses.append('"Churn" = ?')
+            params.append(churn)
+        if start:
+            clauses.append('"timestamp" >= ?')
+            params.append(start)
+        if end:
+            clauses.append('"timestamp" < ?')
+            params.append(end)
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        return where, params
+
+    def count(self, **filters):
+        self._ensure_schema()
+        where, params = self._where(**filters)
+        with self._connect() as connection:
+            return connection.execute(f'SELECT COUNT(*) FROM history {where}', params).fetchone()[0]
+
+    def fetch_page(self, limit=50, offset=0, sort_by='timestamp', descending=True, **filters):
+        self._ensure_schema()
+        if sort_by not in sortable_columns:
+            raise ValueError(f'Cannot sort history by {sort_by!r}')
+        where, params = self._where(**filters)
+        direction = 'DESC' if descending else 'ASC'
+        columns = ', '.join(f'"{column}"' for column in history_columns)
+        query = (f'SELECT {columns} FROM history {where} '
+                 f'ORDER BY "{sort_by}" {direction}, id {direction} LIMIT ? OFFSET ?')
+        with self._connect() as connection:
+            return pd.read_sql_query(query, connection, params=params + [limit, offset])
+
+    def models(self):
+        self._ensure_schema()
+        with self._connect() as connection:
+            rows = connection.execute('SELECT DISTINCT "Model" FROM history WHERE "Model" IS NOT NULL ORDER BY "Model"')
+            return [row[0] for row in rows]
+
+
+# -------- Writes history in batches from a background thread, off the prediction path
+class HistoryWriter:
+    def __init__(self, store, max_batch_rows=500, flush_interval=1.0, max_queued_rows=100000):
+        self.store = store
+        self.max_batch_rows = max_batch_rows
+        self.flush_interval = flush_interval
+        # Bounded by rows, not frames, so bulk scoring is slowed down rather than
+        # piling up rows in memory
+        self.max_queued_rows = max_queued_rows
+        self.records = queue.Queue()
+        self._queued_rows = 0
+        self._space = threading.Condition()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def submit(self, data):
+        # Stamp the rows now so the recorded time is the prediction time, not the write time
+        data = data.copy()
+        if 'timestamp' not in data.columns:
+            data['timestamp'] = datetime.now().isoformat(timespec='seconds')
+        with self._space:
+            # A frame larger than the bound is still accepted once nothing else is queued
+            self._space.wait_for(lambda: self._queued_rows == 0 or self._stopped.is_set()
+                                 or self._queued_rows + len(data) <= self.max_queued_rows)
+            self._queued_rows += len(data)
+        self.records.put(data)
+
+    def _run(self):
+        pending, pending_rows, oldest = [], 0, None
+        while True:
+            timeout = self.flush_interval if oldest is None else max(oldest + self.flush_interval - time.monotonic(), 0)
+            try:
+                item = self.records.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, pd.DataFrame):
+                pending.append(item)
+                pending_rows += len(item)
+                oldest = oldest or time.monotonic()
+
+            # Flush once the batch is big enough, the oldest rows have waited long enough,
+            # or a caller asked for it
+            due = oldest is not None and time.monotonic() - oldest >= self.flush_interval
+            if pending and (item is _flush or item is _stop or due or pending_rows >= self.max_batch_rows):
+                self._write(pending)
+                with self._space:
+                    self._queued_rows -= pending_rows
+                    self._space.notify_all()
+                for _ in pending:
+                    self.records.task_done()
+                pending, pending_rows, oldest = [], 0, None
+
+            if item is _flush or item is _stop:
+                self.records.task_done()
+            if item is _stop:
+                return
+
+    def _write(self, pending):
+        data = pd.concat(pending, ignore_index=True)
+        try:
+            with timer('history_write'):
+                self.store.append(data)
+        except Exception:
+            logging.getLogger(__name__).exception('Failed to write %d prediction history rows', len(data))
+            return
+        # Count the stored rows into the drift summaries while they are still in memory
+        try:
+            with timer('drift_update'):
+                drift_monitor.update(data)
+        except Exception:
+            logging.getLogger(__name__).exception('Failed to update drift statistics')
+
+    def flush(self):
+        # Block until everything submitted so far has been written
+        if not self._stopped.is_set():
+            self.records.put(_flush)
+            self.records.join()
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        with self._space:
+            self._space.notify_all()
+        self.records.put(_stop)
+        self._worker.join()
+
+
+_flush = object()
+_stop = object()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# Shared by every session in the process; the only store that imports the legacy csv file
+history_store = HistoryStore(legacy_path=legacy_history_path)
+
+
+# --------- One writer per process
+def get_history_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = HistoryWriter(history_store)
+        return _writer
@@ -0,0 +1,168 @@
+# Dashboard aggregates kept up to date as rows are appended to a csv file.
+#
+# The partial aggregates (group sums and counts, fixed-width histogram bins)
+# are stored with the byte offset of the last row they include. A refresh
+# reads only the bytes after that offset, in chunks, and merges their
+# partials into the stored ones, so its cost follows the size of the
+# appended data.
+#
+# The file is expected to only ever grow by appended rows. Edits are caught
+# when they touch the first block or the block just before the offset (both
+# checksummed), when they leave the size unchanged but move the mtime, or when
+# the file shrank, its header changed or the schema was bumped; then the
+# aggregates are rebuilt from the start of the file. An edit elsewhere in the
+# rows already counted that also changes the size goes unnoticed. A last row
+# without a trailing newline is counted in the returned aggregates but not
+# stored, since it may still be being written.
+import hashlib
+import io
+import os
+import pickle
+import threading
+import pandas as pd
+from utils.aggregates import eda_partials, group_partials, merge_eda_partials, merge_group_partials
+from utils.ingest import normalize_chunk, schema_version
+from utils.metrics import timer
+
+# Define file paths
+aggregates_dir = './data/aggregates'
+
+# Bytes hashed at the start of the file and just before the stored offset
+check_bytes = 64 * 1024
+# Bytes of csv parsed at a time
+read_block_bytes = 32 * 1024 * 1024
+# Bumped when the partials are computed differently, so stored ones are rebuilt
+aggregates_version = 2
+
+_lock = threading.Lock()
+_states = {}
+
+
+def state_path(csv_path):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(aggregates_dir, f'{name}.pkl')
+
+
+def _checksums(source, offset):
+    source.seek(0)
+    head = hashlib.sha256(source.read(min(offset, check_bytes))).hexdigest()
+    start = max(offset - check_bytes, 0)
+    source.seek(start)
+    tail = hashlib.sha256(source.read(offset - start)).hexdigest()
+    return head, tail
+
+
+def _read_state(path):
+    try:
+        with open(path, 'rb') as state_file:
+            return pickle.load(state_file)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _write_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as state_file:
+        pickle.dump(state, state_file)
+    os.replace(tmp_path, path)
+
+
+# -------- Whether the stored state still describes the start of the file
+def _is_prefix(state, source, header, stat):
+    if state is None or state.get('schema_version') != schema_version or state['header'] != header:
+        return False
+    if state.get('aggregates_version') != aggregates_version:
+        return False
+    if stat.st_size < state['offset']:
+        return False
+    # Same size but written since: rewritten in place rather than appended to
+    if stat.st_size == state.get('size') and stat.st_mtime_ns != state.get('mtime_ns'):
+        return False
+    return _checksums(source, state['offset']) == (state['head'], state['tail'])
+
+
+def _empty_state(header):
+    return {
+        'schema_version': schema_version,
+        'aggregates_version': aggregates_version,
+        'header': header,
+        'offset': len(header),
+        'rows': 0,
+        'grouped': None,
+        'eda': None,
+        'rebuilds': 0,
+    }
+
+
+# -------- Parse csv rows and merge their partials into the state
+def _merge_rows(state, lines):
+    raw = pd.read_csv(io.BytesIO(state['header'] + lines), dtype=str, keep_default_na=False)
+    if len(raw):
+        typed = normalize_chunk(raw)
+        grouped, eda = group_partials(typed), eda_partials(typed)
+        state['grouped'] = grouped if state['grouped'] is None else merge_group_partials(state['grouped'], grouped)
+        state['eda'] = eda if state['eda'] is None else merge_eda_partials(state['eda'], eda)
+        state['rows'] += len(raw)
+
+
+# -------- Merge complete lines from the offset onwards into the state; returns
+# the bytes after the last newline
+def _apply_delta(state, source, size):
+    source.seek(state['offset'])
+    remaining = b''
+    while state['offset'] + len(remaining) < size:
+        block = remaining + source.read(read_block_bytes)
+        end = block.rfind(b'\n') + 1
+        if end == 0:
+            remaining = block
+            continue
+        complete, remaining = block[:end], block[end:]
+        _merge_rows(state, complete)
+        state['offset'] += end
+    state['head'], state['tail'] = _checksums(source, state['offset'])
+    return remaining
+
+
+# -------- Bring the stored aggregates of a csv file up to date and return them
+def refresh(csv_path):
+    path = state_path(csv_path)
+    stat = os.stat(csv_path)
+    with _lock:
+        cached = _states.get(path)
+        if cached is not None and cached[0] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+
+        with open(csv_path, 'rb') as source:
+            header = source.readline()
+            state = cached[1] if cached is not None else _read_state(path)
+            if _is_prefix(state, source, header, stat):
+                state = dict(state, delta_rows=state['rows'])
+                with timer('aggregates_delta'):
+                    unterminated = _apply_delta(state, source, stat.st_size)
+                state['delta_rows'] = state['rows'] - state['delta_rows']
+            else:
+                rebuilds = state['rebuilds'] + 1 if state is not None else 0
+                state = _empty_state(header)
+                state['rebuilds'] = rebuilds
+                with timer('aggregates_rebuild'):
+                    unterminated = _apply_delta(state, source, stat.st_size)
+                state['delta_rows'] = state['rows']
+        state['size'], state['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+
+        _write_state(path, state)
+        # The stored state stops at the last newline; a final row without one is
+        # only merged into what this file version returns
+        result = state
+        if unterminated.strip():
+            result = dict(state)
+            _merge_rows(result, unterminated + b'\n')
+            result['delta_rows'] += result['rows'] - state['rows']
+        _states[path] = ((stat.st_size, stat.st_mtime_ns), state, result)
+        return result
+
+
+# -------- Size and mtime of the file; cheap enough to key caches on every rerun
+def file_version(csv_path):
+    stat = os.stat(csv_path)
+    return stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import pandas as pd
+from utils import shared_models
+from utils.fingerprint import file_fingerprint
+from utils.metrics import timer
+from utils.transformers import feature_columns, load_pipeline
+
+# Define file paths
+model_paths = {
+    'Gradient Boosting': 'model/GradientBoosting.joblib',
+    'Support Vector': 'model/SupportVector.joblib',
+    # Built by `python -m utils.approx_svm`
+    'Support Vector (approx.)': 'model/SupportVectorApprox.joblib',
+}
+local_encoder_path = 'model/label_encoder.joblib'
+
+# Retrained versions, written by `python -m utils.training`
+versions_dir = 'model/versions'
+latest_pointer = os.path.join(versions_dir, 'LATEST')
+
+# NumPy exports of a pipeline, kept next to the pipeline they were made from.
+# Built when the pipeline first loads, or ahead of time with `python -m utils.tree_export`
+compiled_paths = {
+    'Gradient Boosting': 'model/GradientBoosting.compiled.joblib',
+}
+
+_lock = threading.Lock()
+_model_locks = {}
+_encoders = {}
+_predictors = {}
+_executor = None
+
+
+# -------- Keeps a pipeline and the label encoder resident and scores data with them
+class Predictor:
+    def __init__(self, name, model, encoder, signature=None, compiled=None):
+        self.name = name
+        self.model = model
+        self.encoder = encoder
+        self.signature = signature
+        self.compiled = compiled
+        # The resampling step is skipped at transform time, so every step before
+        # the classifier can run as a single preprocessing pass
+        self.preprocessor = model[:-1]
+        self.classifier = model.steps[-1][1]
+
+    def predict_frame(self, data):
+        if self.compiled is not None:
+            # Fast path: the exported arrays give the same probabilities without sklearn
+            with timer('compiled_predict_proba', self.name):
+                prediction_proba = self.compiled.predict_proba(data)
+            encoded = self.classifier.classes_[prediction_proba.argmax(axis=1)]
+            with timer('inverse_transform', self.name):
+                prediction = self.encoder.inverse_transform(encoded)
+            return prediction, prediction_proba
+
+        with timer('transform', self.name):
+            features = self.preprocessor.transform(data[feature_columns])
+        with timer('predict_proba', self.name):
+            prediction_proba = self.classifier.predict_proba(features)
+
+        if getattr(self.classifier, 'probability', False):
+            # SVC probabilities come from Platt scaling and can disagree with its
+            # decision function, so take the label from the classifier itself
+            with timer('predict', self.name):
+                encoded = self.classifier.predict(features)
+        else:
+            encoded = self.classifier.classes_[prediction_proba.argmax(axis=1)]
+
+        with timer('inverse_transform', self.name):
+            prediction = self.encoder.inverse_transform(encoded)
+        return prediction, prediction_proba
+
+    @property
+    def can_explain(self):
+        return self.compiled is not None and self.compiled.can_explain
+
+    # Contributions of each input column to the churn log-odds, from the compiled trees
+    def explain_frame(self, data):
+        return self.compiled.contributions(data)
+
+    def explain_one(self, record):
+        bias, contributions = self.explain_frame(pd.DataFrame([record], columns=feature_columns))
+        return bias, contributions.iloc[0]
+
+    def predict_records(self, records):
+        data = pd.DataFrame(records, columns=feature_columns)
+        return self.predict_frame(data)
+
+    def predict_one(self, record):
+        prediction, prediction_proba = self.predict_records([record])
+        return prediction[0], prediction_proba[0]
+
+
+# --------- Resolve an artifact to the newest published version that has it
+def latest_version():
+    try:
+        with open(latest_pointer) as pointer_file:
+            return pointer_file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_path(name):
+    default_path = model_paths[name] if name in model_paths else local_encoder_path
+    version = latest_version()
+    if version is not None:
+        path = os.path.join(versions_dir, version, os.path.basename(default_path))
+        if os.path.exists(path):
+            return path
+    return default_path
+
+
+# --------- Identify the version of an artifact on disk
+def artifact_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _signature(name):
+    # The compiled export follows the pipeline: it is checked and rebuilt whenever the pipeline loads
+    path = resolve_path(name)
+    return path, artifact_signature(path)
+
+
+def compiled_path(name):
+    if name not in compiled_paths:
+        return None
+    return os.path.join(os.path.dirname(resolve_path(name)), os.path.basename(compiled_paths[name]))
+
+
+# --------- Load the NumPy export of a pipeline made from the current artifact,
+# exporting it first when it is missing or was made from another file
+def load_compiled(name, model=None):
+    path = compiled_path(name)
+    if path is None:
+        return None
+    from utils.tree_export import CompiledGradientBoosting, export
+    mmap_mode = 'r' if shared_models.enabled else None
+    source_path = resolve_path(name)
+    if os.path.exists(path):
+        compiled = CompiledGradientBoosting.load(path, mmap_mode=mmap_mode)
+        if compiled.source_fingerprint == file_fingerprint(source_path):
+            return compiled
+    try:
+        # Only written once it passes the parity check against the pipeline
+        with timer('compile_model', name):
+            export(source_path, path, pipeline=model)
+    except Exception as error:
+        logging.getLogger(__name__).warning('Scoring %s without the compiled export: %s', name, error)
+        return None
+    return CompiledGradientBoosting.load(path, mmap_mode=mmap_mode)
+
+
+# --------- Models whose artifacts are present
+def available_models():
+    return [name for name in model_paths if os.path.exists(resolve_path(name))]
+
+
+# --------- Load the label encoder once per process and version
+def load_encoder():
+    path = resolve_path('label_encoder')
+    with _lock:
+        if path not in _encoders:
+            _encoders[path] = joblib.load(path)
+        return _encoders[path]
+
+
+# --------- Load a predictor once per process and share it between callers,
+# reloading it when a new version is published or the artifact on disk changes
+def _model_lock(path):
+    with _lock:
+        return _model_locks.setdefault(path, threading.Lock())
+
+
+def get_predictor(name):
+    encoder = load_encoder()
+    signature = _signature(name)
+    with _lock:
+        predictor = _predictors.get(name)
+    if predictor is not None and predictor.signature == signature:
+        return predictor
+
+    # Locked per artifact, so a slow load or first compiled export does not hold up the other models
+    with _model_lock(signature[0]):
+        with _lock:
+            predictor = _predictors.get(name)
+        if predictor is None or predictor.signature != signature:
+            # The replacement is built before it is swapped in, so callers never see a half-loaded model
+            with timer('load_model', name):
+                if shared_models.enabled:
+                    # Arrays are mapped from the host-wide copy instead of unpickled into this process
+                    model = shared_models.load_shared(signature[0])
+                else:
+                    model = load_pipeline(signature[0])
+                predictor = Predictor(name, model, encoder, signature, load_compiled(name, model))
+            with _lock:
+                _predictors[name] = predictor
+        return predictor
+
+
+# --------- Score the same data with several models at once. sklearn and NumPy
+# release the GIL for most of the work, so the models overlap on a thread pool.
+def predict_all(data, names=None):
+    global _executor
+    names = names or available_models()
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=len(model_paths), thread_name_prefix='predict-all')
+
+    def run(name):
+        predictor = get_predictor(name)
+        start = time.perf_counter()
+        prediction, prediction_proba = predictor.predict_frame(data.copy())
+        return name, prediction, prediction_proba, time.perf_counter() - start
+
+    return list(_executor.map(run, names))
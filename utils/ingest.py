@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Bump when the normalized schema changes so stored files are rebuilt
+schema_version = 1
+
+# ------ Normalized schema shared by dataset.csv and cleaned_merged.csv
+flag_columns = ['SeniorCitizen', 'Partner', 'Dependents', 'PhoneService', 'PaperlessBilling', 'Churn']
+phone_service_columns = ['MultipleLines']
+internet_service_columns = ['OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport',
+                            'StreamingTV', 'StreamingMovies']
+category_levels = {
+    'gender': ['Female', 'Male'],
+    'MultipleLines': ['No', 'Yes', 'No phone service'],
+    'InternetService': ['DSL', 'Fiber optic', 'No'],
+    'Contract': ['Month-to-month', 'One year', 'Two year'],
+    'PaymentMethod': ['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)'],
+    **{column: ['No', 'Yes', 'No internet service'] for column in internet_service_columns},
+}
+charge_columns = ['MonthlyCharges', 'TotalCharges']
+
+schema_columns = ['customerID', 'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure',
+                  'PhoneService', 'MultipleLines', 'InternetService', 'OnlineSecurity', 'OnlineBackup',
+                  'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies',
+                  'Contract', 'PaperlessBilling', 'PaymentMethod', 'MonthlyCharges', 'TotalCharges', 'Churn']
+
+
+def _arrow_type(column):
+    if column == 'customerID':
+        return pa.string()
+    if column in flag_columns:
+        return pa.int8()
+    if column == 'tenure':
+        return pa.int16()
+    if column in charge_columns:
+        return pa.float32()
+    return pa.dictionary(pa.int8(), pa.string())
+
+
+schema = pa.schema([pa.field(column, _arrow_type(column)) for column in schema_columns])
+
+# Both spellings of a yes/no answer found in the raw files
+_flag_values = {'True': 1, 'False': 0, 'Yes': 1, 'No': 0, '1': 1, '0': 0}
+_answer_values = {'True': 'Yes', 'False': 'No', 'Yes': 'Yes', 'No': 'No',
+                  'No phone service': 'No phone service', 'No internet service': 'No internet service'}
+
+
+# -------- Normalize a chunk of either raw csv into the shared schema
+def normalize_chunk(raw):
+    raw = raw.apply(lambda column: column.str.strip())
+    df = pd.DataFrame(index=raw.index)
+
+    df['customerID'] = raw['customerID'] if 'customerID' in raw.columns else None
+
+    for column in flag_columns:
+        values = raw[column] if column in raw.columns else pd.Series(None, index=raw.index, dtype=object)
+        df[column] = values.map(_flag_values).astype('Int8')
+
+    df['tenure'] = pd.to_numeric(raw['tenure'], errors='coerce').astype('Int16')
+    for column in charge_columns:
+        df[column] = pd.to_numeric(raw[column], errors='coerce').astype(np.float32)
+
+    for column in ['gender', 'InternetService', 'Contract', 'PaymentMethod']:
+        df[column] = pd.Categorical(raw[column], categories=category_levels[column])
+
+    # dataset.csv leaves these blank when the customer has no phone or internet service
+    no_phone = df['PhoneService'].eq(0).fillna(False).to_numpy(dtype=bool)
+    for column in phone_service_columns:
+        values = raw[column].map(_answer_values).mask(raw[column].eq('') & no_phone, 'No phone service')
+        df[column] = pd.Categorical(values, categories=category_levels[column])
+
+    no_internet = raw['InternetService'].eq('No').to_numpy(dtype=bool)
+    for column in internet_service_columns:
+        values = raw[column].map(_answer_values).mask(raw[column].eq('') & no_internet, 'No internet service')
+        df[column] = pd.Categorical(values, categories=category_levels[column])
+
+    return df[schema_columns]
+
+
+# -------- Read a raw csv in chunks and write it as an uncompressed Arrow (Feather v2) file
+def write_typed(csv_path, path, chunksize=100000):
+    chunks = pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=chunksize)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(normalize_chunk(chunk), schema=schema, preserve_index=False)
+            writer.write_table(table)
+
+
+# -------- Convert typed rows back into the raw form the pipelines were trained on
+def to_model_frame(df):
+    data = pd.DataFrame(index=df.index)
+    data['customerID'] = df['customerID'] if 'customerID' in df.columns else None
+    for column in ['gender', 'MultipleLines', 'InternetService', 'OnlineSecurity', 'OnlineBackup',
+                   'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies', 'Contract', 'PaymentMethod']:
+        data[column] = df[column].astype(object)
+    for column in ['Partner', 'Dependents', 'PhoneService', 'PaperlessBilling']:
+        data[column] = df[column].map({1: 'Yes', 0: 'No'}).astype(object)
+    senior_citizen = df['SeniorCitizen']
+    data['SeniorCitizen'] = senior_citizen.astype('int64') if senior_citizen.notna().all() else senior_citizen.astype('float64')
+    data['tenure'] = df['tenure'].astype('float64')
+    for column in charge_columns:
+        data[column] = df[column].astype('float64')
+    return data
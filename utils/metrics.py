@@ -0,0 +1,133 @@
+# Lightweight latency instrumentation.
+#
+# Wrap a stage with `with timer('stage', model=name):` to record how long it
+# took. Each stage and model keeps a rolling window of recent durations, from
+# which p50/p95/p99 are computed when they are read, so recording a sample is
+# a single append. Set CHURN_METRICS=0 to turn recording off. Set
+# CHURN_METRICS_PORT to also serve the Prometheus text format from the
+# Streamlit process at http://<host>:<port>/metrics.
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+enabled = os.environ.get('CHURN_METRICS', '1') != '0'
+
+# Number of recent samples kept per stage and model
+window_size = 2048
+percentiles = (50, 95, 99)
+
+
+class StageStats:
+    def __init__(self, window=window_size):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+
+# -------- Per stage and model durations, shared by every session in the process
+class MetricsRegistry:
+    def __init__(self, window=window_size):
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, stage, seconds, model=None):
+        key = (stage, model or '')
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StageStats(self.window)
+            stats.add(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _copy(self):
+        with self._lock:
+            return [(stage, model, stats.count, stats.total, np.fromiter(stats.samples, dtype=float))
+                    for (stage, model), stats in sorted(self._stats.items())]
+
+    # -------- One row per stage and model, durations in milliseconds
+    def snapshot(self):
+        rows = []
+        for stage, model, count, total, samples in self._copy():
+            row = {'stage': stage, 'model': model, 'count': count, 'mean_ms': total / count * 1000}
+            for p, value in zip(percentiles, np.percentile(samples, percentiles)):
+                row[f'p{p}_ms'] = value * 1000
+            rows.append(row)
+        return rows
+
+    # -------- Prometheus text exposition format, as a summary per stage and model
+    def prometheus_text(self):
+        lines = ['# HELP churn_stage_seconds Time spent in each stage of the app.',
+                 '# TYPE churn_stage_seconds summary']
+        for stage, model, count, total, samples in self._copy():
+            labels = f'stage="{stage}",model="{model}"'
+            for p, value in zip(percentiles, np.percentile(samples, percentiles)):
+                lines.append(f'churn_stage_seconds{{{labels},quantile="{p / 100}"}} {value:.9f}')
+            lines.append(f'churn_stage_seconds_sum{{{labels}}} {total:.9f}')
+            lines.append(f'churn_stage_seconds_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def timer(stage, model=None):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.record(stage, time.perf_counter() - start, model)
+
+
+# -------- Serve /metrics from a background thread of the current process
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        return _server
+
+
+if enabled and os.environ.get('CHURN_METRICS_PORT'):
+    try:
+        start_metrics_server(int(os.environ['CHURN_METRICS_PORT']), os.environ.get('CHURN_METRICS_HOST', '127.0.0.1'))
+    except OSError:
+        # Another process on this host already serves the port
+        pass
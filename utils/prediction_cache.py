@@ -0,0 +1,107 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from utils.transformers import feature_columns
+
+# customerID does not change the prediction, so it is left out of the cache key
+key_columns = [column for column in feature_columns if column != 'customerID']
+
+
+# -------- Reduce a record to a stable representation of its feature values
+def normalize_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return repr(float(value))
+    if isinstance(value, (int, float)) or hasattr(value, 'dtype'):
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return str(value).strip()
+        return '' if math.isnan(number) else repr(number)
+    text = str(value).strip()
+    try:
+        # Numbers typed as text (eg. TotalCharges from a csv) hash like numbers
+        number = float(text)
+    except ValueError:
+        return text
+    return '' if math.isnan(number) else repr(number)
+
+
+def feature_key(record):
+    normalized = '\x1f'.join(normalize_value(record.get(column)) for column in key_columns)
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# -------- Bounded LRU cache of predictions and explanations keyed on model and feature values
+class PredictionCache:
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        # Counted per kind, so a submit that also explains its prediction is one prediction lookup
+        self.hits = {'prediction': 0, 'explanation': 0}
+        self.misses = {'prediction': 0, 'explanation': 0}
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def _check_signature(self, predictor):
+        # Drop a model's entries once its artifact has been replaced on disk
+        if self._signatures.get(predictor.name) != predictor.signature:
+            stale = [key for key in self._entries if key[0] == predictor.name]
+            for key in stale:
+                del self._entries[key]
+            self._signatures[predictor.name] = predictor.signature
+
+    def predict_one(self, predictor, record):
+        return self._lookup(predictor, record, 'prediction', predictor.predict_one)
+
+    def explain_one(self, predictor, record):
+        return self._lookup(predictor, record, 'explanation', predictor.explain_one)
+
+    def _lookup(self, predictor, record, kind, compute):
+        key = (predictor.name, kind, feature_key(record))
+
+        with self._lock:
+            self._check_signature(predictor)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits[kind] += 1
+                return self._entries[key]
+            self.misses[kind] += 1
+
+        result = compute(record)
+
+        with self._lock:
+            if self._signatures.get(predictor.name) == predictor.signature:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._signatures.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for kind, prefix in (('prediction', ''), ('explanation', 'explanation_')):
+                lookups = self.hits[kind] + self.misses[kind]
+                stats[f'{prefix}hits'] = self.hits[kind]
+                stats[f'{prefix}misses'] = self.misses[kind]
+                stats[f'{prefix}hit_rate'] = self.hits[kind] / lookups if lookups else 0.0
+            return {
+                **stats,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+# Shared by every session in the process
+prediction_cache = PredictionCache()
@@ -0,0 +1,160 @@
+# Precomputed churn risk for every customer in dataset.csv.
+#
+# Run with:
+#     python -m utils.risk_index --model "Gradient Boosting"
+#
+# Every customer is scored once and stored sorted by churn probability, so
+# top-N, percentile and segment queries are served from the stored index.
+# On later runs only customers whose features changed (or who are new) are
+# scored again, unless the model itself changed.
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+from utils.columnar import load_frame, to_pandas
+from utils.inference import get_predictor
+from utils.ingest import to_model_frame
+from utils.transformers import feature_columns
+
+# Define file paths
+dataset_path = './data/dataset.csv'
+risk_index_dir = './data/risk_index'
+
+segment_columns = ['gender', 'SeniorCitizen', 'Contract', 'InternetService', 'PaymentMethod', 'tenure', 'MonthlyCharges']
+score_chunk_rows = 50000
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_indexes = {}
+
+
+def index_path(model_name):
+    slug = model_name.lower().replace(' (approx.)', '_approx').replace(' ', '_')
+    return os.path.join(risk_index_dir, f'{slug}.arrow')
+
+
+def _read_meta(path):
+    try:
+        with open(f'{path}.json') as meta_file:
+            return json.load(meta_file)
+    except FileNotFoundError:
+        return None
+
+
+# -------- Score changed customers and write the sorted index
+def build(model_name, progress=None):
+    predictor = get_predictor(model_name)
+    path = index_path(model_name)
+
+    frame = load_frame(dataset_path, columns=feature_columns)
+    frame = frame[frame['customerID'].notna()].drop_duplicates('customerID', keep='last').reset_index(drop=True)
+    row_hash = pd.util.hash_pandas_object(frame[feature_columns[1:]], index=False).to_numpy()
+
+    # Reuse scores of customers whose features are unchanged, as long as the model is the same
+    scores = np.full(len(frame), np.nan)
+    meta = _read_meta(path)
+    if meta is not None and meta.get('model_signature') == str(predictor.signature) and os.path.exists(path):
+        previous = feather.read_table(path, columns=['customerID', 'row_hash', 'churn_probability']).to_pandas()
+        current = pd.DataFrame({'customerID': frame['customerID'], 'row_hash': row_hash})
+        matched = current.merge(previous, on=['customerID', 'row_hash'], how='left')
+        scores = matched['churn_probability'].to_numpy(dtype=float)
+
+    stale = np.flatnonzero(np.isnan(scores))
+    for start in range(0, len(stale), score_chunk_rows):
+        rows = stale[start:start + score_chunk_rows]
+        _, prediction_proba = predictor.predict_frame(to_model_frame(frame.iloc[rows]))
+        scores[rows] = prediction_proba[:, 1]
+        if progress is not None:
+            progress(min(start + len(rows), len(stale)) / max(len(stale), 1))
+
+    index = frame[['customerID'] + segment_columns].copy()
+    index['churn_probability'] = scores.astype(np.float32)
+    index['percentile'] = (index['churn_probability'].rank(pct=True) * 100).astype(np.float32)
+    index['row_hash'] = row_hash
+    index = index.sort_values('churn_probability', ascending=False, kind='stable').reset_index(drop=True)
+
+    os.makedirs(risk_index_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    feather.write_feather(index, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    with open(f'{path}.json', 'w') as meta_file:
+        json.dump({
+            'model': model_name,
+            'model_signature': str(predictor.signature),
+            'customers': int(len(index)),
+            'rescored': int(len(stale)),
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+        }, meta_file)
+    return len(index), len(stale)
+
+
+# -------- Rebuild in a background thread; one job per model at a time
+def start_background_build(model_name):
+    with _jobs_lock:
+        job = _jobs.get(model_name)
+        if job is not None and job['status'] == 'running':
+            return job
+        job = {'status': 'running', 'progress': 0.0, 'started_at': time.time(), 'error': None}
+        _jobs[model_name] = job
+
+    def run():
+        try:
+            customers, rescored = build(model_name, progress=lambda fraction: job.update(progress=fraction))
+            job.update(status='finished', progress=1.0, customers=customers, rescored=rescored)
+        except Exception as error:
+            job.update(status='failed', error=str(error))
+        job['finished_at'] = time.time()
+
+    threading.Thread(target=run, name=f'risk-index-{model_name}', daemon=True).start()
+    return job
+
+
+def job_status(model_name):
+    with _jobs_lock:
+        return _jobs.get(model_name)
+
+
+def index_info(model_name):
+    return _read_meta(index_path(model_name))
+
+
+# -------- Load the stored index; memory-mapped and reloaded only when rewritten
+def load_index(model_name):
+    path = index_path(model_name)
+    if not os.path.exists(path):
+        return None
+    signature = os.stat(path).st_mtime_ns
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != signature:
+        table = feather.read_table(path, memory_map=True)
+        cached = (signature, to_pandas(table))
+        _indexes[path] = cached
+    return cached[1]
+
+
+# -------- Highest-risk customers matching the filters; the index is already sorted
+def query(index, top_n=500, min_percentile=0.0, segments=None):
+    mask = index['percentile'].to_numpy() >= min_percentile
+    for column, values in (segments or {}).items():
+        if values:
+            mask &= index[column].isin(values).to_numpy()
+    return index.loc[mask].head(top_n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the churn risk index for dataset.csv.')
+    parser.add_argument('--model', default='Gradient Boosting')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    customers, rescored = build(args.model)
+    print(f'Indexed {customers:,} customers, scored {rescored:,} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# Host-wide, memory-mapped copies of the model artifacts.
+#
+# Enable with CHURN_SHARED_MODELS=1 when several app processes run on one
+# host. Each pipeline is re-saved once per host, uncompressed, into
+# CHURN_SHARED_DIR (model/shared by default; /dev/shm keeps it in RAM). Every
+# process then maps it copy-on-write (mmap_mode='c'), so large NumPy arrays
+# such as the SVC support vectors are views of the same page cache instead of
+# private copies; the compiled tree arrays are mapped read-only. The copies are
+# named after the source fingerprint, so a retrained or replaced model gets a
+# fresh copy.
+import os
+import joblib
+from utils.fingerprint import file_fingerprint
+from utils.transformers import load_pipeline
+
+enabled = os.environ.get('CHURN_SHARED_MODELS', '0') == '1'
+shared_dir = os.environ.get('CHURN_SHARED_DIR', 'model/shared')
+
+
+def shared_path(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(shared_dir, f'{name}-{file_fingerprint(path)}.joblib')
+
+
+# -------- Write the uncompressed copy of an artifact, once per host
+def ensure_shared_copy(path):
+    target = shared_path(path)
+    if not os.path.exists(target):
+        os.makedirs(shared_dir, exist_ok=True)
+        # Workers racing here each write their own temporary file; the rename keeps one
+        tmp_path = f'{target}.{os.getpid()}.tmp'
+        joblib.dump(load_pipeline(path), tmp_path, compress=0)
+        os.replace(tmp_path, target)
+    return target
+
+
+# -------- Load an artifact with its arrays mapped from the shared copy. Copy-on-write
+# rather than read-only: libsvm asks for writable buffers when it predicts, and the
+# pages stay shared until something actually writes to them, which scoring does not
+def load_shared(path):
+    return load_pipeline(ensure_shared_copy(path), mmap_mode='c')
@@ -0,0 +1,40 @@
+import numpy as np
+from utils.ingest import category_levels
+
+# Features a what-if sweep can vary, with the range covered by default
+numeric_ranges = {
+    'tenure': (0, 72),
+    'MonthlyCharges': (18.0, 120.0),
+    'TotalCharges': (0.0, 9000.0),
+}
+integer_features = ['tenure', 'SeniorCitizen']
+categorical_options = {
+    'Contract': category_levels['Contract'],
+    'PaymentMethod': category_levels['PaymentMethod'],
+    'InternetService': category_levels['InternetService'],
+    'TechSupport': category_levels['TechSupport'],
+    'OnlineSecurity': category_levels['OnlineSecurity'],
+    'PaperlessBilling': ['Yes', 'No'],
+    'SeniorCitizen': [0, 1],
+}
+sweep_features = list(numeric_ranges) + list(categorical_options)
+
+
+# -------- Values taken by one axis of the sweep
+def axis_values(feature, points, low=None, high=None):
+    if feature in categorical_options:
+        return np.array(categorical_options[feature], dtype=object)
+    default_low, default_high = numeric_ranges[feature]
+    values = np.linspace(default_low if low is None else low, default_high if high is None else high, points)
+    if feature in integer_features:
+        values = np.unique(values.round()).astype(int)
+    return values
+
+
+# -------- Repeat the base customer once per grid point, varying the swept features
+def sweep_frame(base, axes):
+    grids = np.meshgrid(*axes.values(), indexing='ij')
+    data = base.loc[base.index.repeat(grids[0].size)].reset_index(drop=True)
+    for feature, grid in zip(axes, grids):
+        data[feature] = grid.ravel()
+    return data, grids[0].shape
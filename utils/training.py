@@ -0,0 +1,185 @@
+# Retrain the churn pipelines from data/cleaned_merged.csv.
+#
+# Run with:
+#     python -m utils.training --jobs -1
+#
+# Each model is tuned with successive-halving search and cross-validated in
+# parallel. The pipelines, the label encoder and a metadata file with metrics
+# and the training data fingerprint are written to model/versions/<version>/,
+# with the NumPy export of the Gradient Boosting pipeline next to it. Then
+# model/versions/LATEST is switched to the new version in one atomic
+# rename. Running apps pick the new version up on their next prediction.
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+import joblib
+import numpy as np
+import sklearn
+from imblearn.over_sampling import SMOTE
+from imblearn.pipeline import Pipeline as ImbPipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.feature_selection import SelectKBest, mutual_info_classif
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold, cross_validate
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder, PowerTransformer, StandardScaler
+from sklearn.svm import SVC
+from utils.columnar import load_frame
+from utils.fingerprint import file_fingerprint
+from utils.inference import compiled_path, compiled_paths, latest_pointer, model_paths, resolve_path, versions_dir
+from utils.ingest import to_model_frame
+from utils.transformers import TotalCharges_cleaner, columnDropper
+from utils.tree_export import export
+
+# Define file paths
+training_data_path = './data/cleaned_merged.csv'
+
+numeric_columns = ['tenure', 'MonthlyCharges', 'TotalCharges']
+categorical_columns = ['customerID', 'gender', 'Partner', 'Dependents', 'PhoneService', 'MultipleLines',
+                       'InternetService', 'OnlineSecurity', 'OnlineBackup', 'DeviceProtection', 'TechSupport',
+                       'StreamingTV', 'StreamingMovies', 'Contract', 'PaperlessBilling', 'PaymentMethod',
+                       'SeniorCitizen']
+
+# Search spaces for each model, sampled by successive halving
+search_spaces = {
+    'Gradient Boosting': (
+        GradientBoostingClassifier(random_state=42),
+        {
+            'feature_selection__k': [10, 20, 30, 'all'],
+            'classifier__n_estimators': [50, 100, 200, 400],
+            'classifier__learning_rate': [0.03, 0.05, 0.1, 0.2],
+            'classifier__max_depth': [2, 3, 4, 5],
+            'classifier__subsample': [0.8, 1.0],
+        },
+    ),
+    'Support Vector': (
+        SVC(probability=True, random_state=42),
+        {
+            'feature_selection__k': [10, 20, 30, 'all'],
+            'classifier__C': [0.1, 0.3, 1, 3, 10],
+            'classifier__gamma': ['scale', 0.01, 0.03, 0.1],
+        },
+    ),
+}
+
+
+# Rows in the first round of successive halving. The first rounds train on small
+# subsamples, and SMOTE needs more than k_neighbors (5) churners in every
+# training fold; 500 rows give about a hundred
+min_search_rows = 500
+
+
+# -------- Same structure as the original notebook pipelines
+def build_pipeline(classifier):
+    num_pipeline = Pipeline([
+        ('total_charges_cleaner', TotalCharges_cleaner()),
+        ('imputer', SimpleImputer(strategy='mean')),
+        ('pt_transform', PowerTransformer(method='yeo-johnson')),
+        ('scaling', StandardScaler()),
+    ])
+    cat_pipeline = Pipeline([
+        ('column_dropper', columnDropper()),
+        ('imputer', SimpleImputer(strategy='constant', fill_value='missing')),
+        ('encoder', OneHotEncoder(handle_unknown='ignore', sparse_output=False)),
+    ])
+    preprocessor = ColumnTransformer([
+        ('num_pipeline', num_pipeline, numeric_columns),
+        ('cat_pipeline', cat_pipeline, categorical_columns),
+    ])
+    return ImbPipeline([
+        ('preprocessor', preprocessor),
+        ('smote', SMOTE(random_state=42)),
+        ('feature_selection', SelectKBest(mutual_info_classif, k='all')),
+        ('classifier', classifier),
+    ])
+
+
+def train(name, X, y, n_jobs=-1, folds=5):
+    classifier, space = search_spaces[name]
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+
+    # A failed fit raises instead of scoring NaN, so no candidate is promoted on a failed round
+    search = HalvingRandomSearchCV(build_pipeline(classifier), space, factor=3, cv=cv, scoring='roc_auc',
+                                   min_resources=min(min_search_rows, len(X)), error_score='raise',
+                                   n_jobs=n_jobs, random_state=42, refit=True)
+    search.fit(X, y)
+
+    scores = cross_validate(search.best_estimator_, X, y, cv=cv, n_jobs=n_jobs,
+                            scoring=['roc_auc', 'f1', 'accuracy', 'precision', 'recall'])
+    metrics = {metric[len('test_'):]: float(np.mean(values))
+               for metric, values in scores.items() if metric.startswith('test_')}
+    return search.best_estimator_, {'best_params': search.best_params_, 'cv_metrics': metrics}
+
+
+# -------- Write a new version and switch LATEST to it atomically
+def publish(version, pipelines, encoder, metadata):
+    version_dir = os.path.join(versions_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    for name, path in model_paths.items():
+        target = os.path.join(version_dir, os.path.basename(path))
+        compiled_target = os.path.join(version_dir, os.path.basename(compiled_paths[name])) if name in compiled_paths else None
+        if name in pipelines:
+            joblib.dump(pipelines[name], target)
+            if compiled_target is not None:
+                # The fast scoring path only accepts an export made from this exact file
+                try:
+                    export(target, compiled_target, pipeline=pipelines[name])
+                except (NotImplementedError, ValueError) as error:
+                    print(f'Not compiling {name}: {error}')
+        elif os.path.exists(resolve_path(name)):
+            # Carry over models that were not retrained so the version is complete.
+            # copy2 keeps the modification time, so the export still matches the copy
+            shutil.copy2(resolve_path(name), target)
+            if compiled_target is not None and os.path.exists(compiled_path(name)):
+                shutil.copy2(compiled_path(name), compiled_target)
+    joblib.dump(encoder, os.path.join(version_dir, 'label_encoder.joblib'))
+    with open(os.path.join(version_dir, 'metadata.json'), 'w') as metadata_file:
+        json.dump(metadata, metadata_file, indent=2, default=str)
+
+    tmp_pointer = f'{latest_pointer}.{os.getpid()}.tmp'
+    with open(tmp_pointer, 'w') as pointer_file:
+        pointer_file.write(version)
+    os.replace(tmp_pointer, latest_pointer)
+    return version_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retrain the churn pipelines and publish a new model version.')
+    parser.add_argument('--models', nargs='+', default=list(search_spaces), choices=list(search_spaces))
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel workers, -1 uses every core')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--data', default=training_data_path)
+    args = parser.parse_args()
+
+    frame = load_frame(args.data)
+    frame = frame[frame['Churn'].notna()].reset_index(drop=True)
+    X = to_model_frame(frame)
+    encoder = LabelEncoder().fit(['No', 'Yes'])
+    y = encoder.transform(frame['Churn'].map({1: 'Yes', 0: 'No'}))
+
+    version = datetime.now().strftime('%Y%m%d-%H%M%S')
+    metadata = {
+        'version': version,
+        'trained_at': datetime.now().isoformat(timespec='seconds'),
+        'data': {'path': args.data, 'fingerprint': file_fingerprint(args.data), 'rows': int(len(frame))},
+        'sklearn_version': sklearn.__version__,
+        'models': {},
+    }
+
+    pipelines = {}
+    for name in args.models:
+        print(f'Training {name}...')
+        pipelines[name], metadata['models'][name] = train(name, X, y, args.jobs, args.folds)
+        metrics = metadata['models'][name]['cv_metrics']
+        print(f"  roc_auc {metrics['roc_auc']:.3f} · f1 {metrics['f1']:.3f} · accuracy {metrics['accuracy']:.3f}")
+
+    version_dir = publish(version, pipelines, encoder, metadata)
+    print(f'Published {version_dir}')
+
+
+if __name__ == '__main__':
+    main()
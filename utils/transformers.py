@@ -0,0 +1,69 @@
+import numpy as np
+from joblib import numpy_pickle
+from sklearn.base import BaseEstimator, TransformerMixin
+from utils.metrics import timer
+
+# Columns the pipelines expect, in the order they were trained on
+feature_columns = ['customerID', 'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure',
+                   'PhoneService', 'MultipleLines', 'InternetService', 'OnlineSecurity', 'OnlineBackup',
+                   'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies',
+                   'Contract', 'PaperlessBilling', 'PaymentMethod', 'MonthlyCharges', 'TotalCharges']
+
+# Custom function to deal with cleaning the total charges column
+class TotalCharges_cleaner(BaseEstimator, TransformerMixin):
+    def fit(self, X, y=None):
+        return self
+        
+    def transform(self, X):
+        with timer('total_charges_cleaner'):
+            # Replace empty string with NA
+            X['TotalCharges'].replace(' ', np.nan, inplace=True)
+            # Convert the values in the TotalCharges column to a float
+            X['TotalCharges'] = X['TotalCharges'].astype(float)
+        return X
+        
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        pass
+        
+    def get_feature_names_out(self, input_features=None):
+        return input_features
+
+# Create a class to deal with dropping Customer ID from the dataset
+class columnDropper(BaseEstimator, TransformerMixin):
+    def fit(self, X, y=None):
+        return self
+        
+    def transform(self, X):
+        return X.drop('customerID', axis=1)
+        
+    def get_feature_names_out(self, input_features=None):
+        if input_features is None:
+            return None
+        return [feature for feature in input_features if feature != 'customerID']
+
+# -------- Load a pipeline pickled from a notebook
+# The saved pipelines reference the transformers as attributes of __main__.
+# Streamlit swaps sys.modules['__main__'] on every script run, so they are
+# resolved here by the unpickler instead of through whatever __main__ is.
+pickled_transformers = {transformer.__name__: transformer for transformer in (TotalCharges_cleaner, columnDropper)}
+
+
+class TransformerUnpickler(numpy_pickle.NumpyUnpickler):
+    def find_class(self, module, name):
+        if module == '__main__' and name in pickled_transformers:
+            return pickled_transformers[name]
+        return super().find_class(module, name)
+
+
+def load_pipeline(path, mmap_mode=None):
+    # Same steps as joblib.load, with the unpickler above
+    with open(path, 'rb') as file:
+        if hasattr(numpy_pickle, '_validate_fileobject_and_memmap'):
+            # joblib 1.5 and later also take the byte order policy
+            with numpy_pickle._validate_fileobject_and_memmap(file, path, mmap_mode) as (fobj, mmap_mode):
+                return TransformerUnpickler(path, fobj, mmap_mode is None, mmap_mode=mmap_mode).load()
+        with numpy_pickle._read_fileobject(file, path, mmap_mode) as fobj:
+            return TransformerUnpickler(path, fobj, mmap_mode=mmap_mode).load()
@@ -0,0 +1,334 @@
+# Compile the Gradient Boosting pipeline into flat NumPy arrays.
+#
+# Run with:
+#     python -m utils.tree_export
+#
+# The fitted preprocessing (imputers, Yeo-Johnson, scalers, one-hot encoding,
+# feature selection) and every boosted tree are exported to plain arrays and
+# evaluated without going through sklearn. The export is only written after
+# its probabilities match the pipeline's predict_proba on cleaned_merged.csv.
+import argparse
+import os
+import threading
+import numpy as np
+import pandas as pd
+import joblib
+from scipy.special import expit
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OneHotEncoder, PowerTransformer, StandardScaler
+from utils.columnar import load_frame
+from utils.fingerprint import file_fingerprint
+from utils.ingest import to_model_frame
+from utils.transformers import TotalCharges_cleaner, columnDropper, load_pipeline
+
+# Define file paths
+local_model_path = 'model/GradientBoosting.joblib'
+compiled_model_path = 'model/GradientBoosting.compiled.joblib'
+parity_data_path = './data/cleaned_merged.csv'
+
+# Rows traversed together; bounds the size of the (rows x trees) node index arrays
+block_rows = 8192
+
+
+# -------- Same arithmetic as PowerTransformer._yeo_johnson_transform
+def _yeo_johnson(x, lmbda):
+    out = np.zeros_like(x)
+    pos = x >= 0
+    if abs(lmbda) < np.spacing(1.0):
+        out[pos] = np.log1p(x[pos])
+    else:
+        out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+    if abs(lmbda - 2) > np.spacing(1.0):
+        out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+    else:
+        out[~pos] = -np.log1p(-x[~pos])
+    return out
+
+
+# -------- Numeric input converted like the pipeline does: TotalCharges_cleaner turns
+# blanks into NaN, and values that are not numbers raise instead of being imputed
+def _as_float(series, column):
+    if column == 'TotalCharges':
+        series = series.replace(' ', np.nan)
+    return series.astype(float).to_numpy(dtype=float)
+
+
+def _scaler_step(scaler):
+    return ('scale',
+            None if scaler.mean_ is None or not scaler.with_mean else np.asarray(scaler.mean_, dtype=float),
+            None if scaler.scale_ is None or not scaler.with_std else np.asarray(scaler.scale_, dtype=float))
+
+
+def _compile_numeric(pipeline, columns):
+    steps = []
+    for _, step in pipeline.steps:
+        if isinstance(step, TotalCharges_cleaner):
+            continue
+        elif isinstance(step, SimpleImputer):
+            steps.append(('impute', np.asarray(step.statistics_, dtype=float)))
+        elif isinstance(step, PowerTransformer) and step.method == 'yeo-johnson':
+            steps.append(('yeo_johnson', np.asarray(step.lambdas_, dtype=float)))
+            if step.standardize:
+                steps.append(_scaler_step(step._scaler))
+        elif isinstance(step, StandardScaler):
+            steps.append(_scaler_step(step))
+        else:
+            raise NotImplementedError(f'Cannot compile numeric step {type(step).__name__}')
+    return {'columns': list(columns), 'steps': steps, 'width': len(columns), 'sources': list(columns)}
+
+
+def _compile_categorical(pipeline, columns):
+    columns = list(columns)
+    fill_values = [None] * len(columns)
+    encoder = None
+    for _, step in pipeline.steps:
+        if isinstance(step, columnDropper):
+            columns = [column for column in columns if column != 'customerID']
+            fill_values = [None] * len(columns)
+        elif isinstance(step, SimpleImputer) and step.strategy == 'constant':
+            fill_values = list(step.statistics_)
+        elif isinstance(step, OneHotEncoder):
+            encoder = step
+        else:
+            raise NotImplementedError(f'Cannot compile categorical step {type(step).__name__}')
+
+    if encoder is None or getattr(encoder, '_infrequent_enabled', False) or encoder.handle_unknown != 'ignore':
+        raise NotImplementedError('Only one-hot encoders ignoring unknown categories can be compiled')
+
+    drop_idx = encoder.drop_idx_ if encoder.drop_idx_ is not None else [None] * len(columns)
+    encoded, sources, offset = [], [], 0
+    for column, fill_value, categories, dropped in zip(columns, fill_values, encoder.categories_, drop_idx):
+        kept = [category for i, category in enumerate(categories) if dropped is None or i != dropped]
+        encoded.append((column, fill_value, {category: offset + i for i, category in enumerate(kept)}))
+        sources += [column] * len(kept)
+        offset += len(kept)
+    return {'columns': encoded, 'width': offset, 'sources': sources}
+
+
+def _compile_trees(classifier, n_features):
+    if not isinstance(classifier, GradientBoostingClassifier) or classifier.estimators_.shape[1] != 1:
+        raise NotImplementedError('Only binary GradientBoostingClassifier models can be compiled')
+    if classifier.init_ != 'zero' and not isinstance(classifier.init_, DummyClassifier):
+        raise NotImplementedError('Only constant init estimators can be compiled')
+
+    trees = [estimator.tree_ for estimator in classifier.estimators_[:, 0]]
+    n_trees = len(trees)
+    n_nodes = max(tree.node_count for tree in trees)
+
+    # Leaves point to themselves, so every row can take the same number of steps
+    feature = np.zeros((n_trees, n_nodes), dtype=np.intp)
+    threshold = np.full((n_trees, n_nodes), np.inf)
+    left = np.tile(np.arange(n_nodes, dtype=np.intp), (n_trees, 1))
+    right = left.copy()
+    value = np.zeros((n_trees, n_nodes))
+
+    for t, tree in enumerate(trees):
+        count = tree.node_count
+        split = tree.children_left != -1
+        feature[t, :count][split] = tree.feature[split]
+        threshold[t, :count][split] = tree.threshold[split]
+        left[t, :count][split] = tree.children_left[split]
+        right[t, :count][split] = tree.children_right[split]
+        value[t, :count] = tree.value[:, 0, 0]
+
+    # The init estimator predicts a constant, so its raw score is recovered from any row
+    sample = np.zeros((1, n_features))
+    tree_sum = sum(estimator.predict(sample)[0] for estimator in classifier.estimators_[:, 0])
+    init_raw = classifier.decision_function(sample)[0] - classifier.learning_rate * tree_sum
+
+    return {
+        'feature': feature.ravel(),
+        'threshold': threshold.ravel(),
+        'left': left.ravel(),
+        'right': right.ravel(),
+        'value': value.ravel(),
+        'n_trees': n_trees,
+        'n_nodes': n_nodes,
+        'depth': max(tree.max_depth for tree in trees),
+        'learning_rate': classifier.learning_rate,
+        'init_raw': float(init_raw),
+    }
+
+
+# -------- Evaluates the exported preprocessing and trees with NumPy only
+class CompiledGradientBoosting:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.numeric = arrays['numeric']
+        self.categorical = arrays['categorical']
+        self.support = arrays['support']
+        self.trees = arrays['trees']
+        self.source_fingerprint = arrays.get('source_fingerprint')
+
+    @classmethod
+    def from_pipeline(cls, pipeline, source_fingerprint=None):
+        preprocessor = pipeline.named_steps['preprocessor']
+        numeric = categorical = None
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop':
+                continue
+            if name == 'num_pipeline':
+                numeric = _compile_numeric(transformer, columns)
+            elif name == 'cat_pipeline':
+                categorical = _compile_categorical(transformer, columns)
+            else:
+                raise NotImplementedError(f'Cannot compile column transformer {name!r}')
+        if [name for name, _, _ in preprocessor.transformers_ if name != 'remainder'] != ['num_pipeline', 'cat_pipeline']:
+            raise NotImplementedError('Expected the numeric pipeline before the categorical pipeline')
+
+        support = pipeline.named_steps['feature_selection'].get_support(indices=True)
+        trees = _compile_trees(pipeline.steps[-1][1], len(support))
+        # Input column behind every selected model feature, used to attribute contributions
+        sources = np.array(numeric['sources'] + categorical['sources'], dtype=object)[support]
+        return cls({
+            'numeric': numeric,
+            'categorical': categorical,
+            'support': support,
+            'feature_sources': list(sources),
+            'trees': trees,
+            'source_fingerprint': source_fingerprint,
+        })
+
+    def transform(self, data):
+        n_rows = len(data)
+        width = self.numeric['width'] + self.categorical['width']
+        X = np.zeros((n_rows, width))
+
+        numeric = np.column_stack([_as_float(data[column], column) for column in self.numeric['columns']])
+        for step in self.numeric['steps']:
+            if step[0] == 'impute':
+                numeric = np.where(np.isnan(numeric), step[1], numeric)
+            elif step[0] == 'yeo_johnson':
+                for i, lmbda in enumerate(step[1]):
+                    numeric[:, i] = _yeo_johnson(numeric[:, i], lmbda)
+            else:
+                _, mean, scale = step
+                if mean is not None:
+                    numeric -= mean
+                if scale is not None:
+                    numeric /= scale
+        X[:, :self.numeric['width']] = numeric
+
+        offset = self.numeric['width']
+        rows = np.arange(n_rows)
+        for column, fill_value, lookup in self.categorical['columns']:
+            values = data[column].to_numpy(dtype=object)
+            if fill_value is not None:
+                values = np.where(pd.isna(values), fill_value, values)
+            positions = np.fromiter((lookup.get(value, -1) for value in values), dtype=np.intp, count=n_rows)
+            # Unknown categories stay all zeros, like handle_unknown='ignore'
+            known = positions >= 0
+            X[rows[known], offset + positions[known]] = 1.0
+
+        return X[:, self.support]
+
+    def decision_function(self, data):
+        X = self.transform(data)
+        trees = self.trees
+        # Trees compare float32 features against float64 thresholds, as sklearn does
+        X = X.astype(np.float32)
+        tree_offsets = np.arange(trees['n_trees']) * trees['n_nodes']
+        raw = np.empty(len(X))
+
+        for start in range(0, len(X), block_rows):
+            block = X[start:start + block_rows]
+            block_index = np.arange(len(block))[:, None]
+            nodes = np.broadcast_to(tree_offsets, (len(block), trees['n_trees'])).copy()
+            for _ in range(trees['depth']):
+                go_left = block[block_index, trees['feature'][nodes]] <= trees['threshold'][nodes]
+                nodes = tree_offsets + np.where(go_left, trees['left'][nodes], trees['right'][nodes])
+            raw[start:start + block_rows] = trees['init_raw'] + trees['learning_rate'] * trees['value'][nodes].sum(axis=1)
+        return raw
+
+    def predict_proba(self, data):
+        churn = expit(self.decision_function(data))
+        return np.column_stack([1 - churn, churn])
+
+    @property
+    def can_explain(self):
+        return 'feature_sources' in self.arrays
+
+    # -------- Path-based contributions: every split a row passes through moves its
+    # score by the change in node value, credited to the split's feature. Per row,
+    # bias + contributions add up exactly to the decision function (log-odds).
+    def contributions(self, data):
+        X = self.transform(data).astype(np.float32)
+        trees = self.trees
+        n_features = X.shape[1]
+        tree_offsets = np.arange(trees['n_trees']) * trees['n_nodes']
+        per_feature = np.zeros((len(X), n_features))
+
+        for start in range(0, len(X), block_rows):
+            block = X[start:start + block_rows]
+            n_block = len(block)
+            block_index = np.arange(n_block)[:, None]
+            nodes = np.broadcast_to(tree_offsets, (n_block, trees['n_trees'])).copy()
+            for _ in range(trees['depth']):
+                features = trees['feature'][nodes]
+                go_left = block[block_index, features] <= trees['threshold'][nodes]
+                children = tree_offsets + np.where(go_left, trees['left'][nodes], trees['right'][nodes])
+                # Leaves point to themselves, so their change in value is zero
+                change = trees['value'][children] - trees['value'][nodes]
+                flat = (block_index * n_features + features).ravel()
+                per_feature[start:start + n_block] += np.bincount(
+                    flat, weights=change.ravel(), minlength=n_block * n_features).reshape(n_block, n_features)
+                nodes = children
+
+        per_feature *= trees['learning_rate']
+        bias = trees['init_raw'] + trees['learning_rate'] * trees['value'][tree_offsets].sum()
+
+        # Fold one-hot and scaled features back onto the input columns they came from
+        sources = pd.Index(self.arrays['feature_sources'])
+        columns = list(dict.fromkeys(sources))
+        mapping = (sources.to_numpy()[:, None] == np.array(columns, dtype=object)[None, :]).astype(float)
+        return bias, pd.DataFrame(per_feature @ mapping, columns=columns, index=data.index)
+
+    def save(self, path):
+        joblib.dump(self.arrays, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        # The arrays are saved uncompressed, so they can be mapped read-only
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+
+
+# -------- Guard the export: probabilities and labels must match the pipeline
+def check_parity(pipeline, compiled, data, tolerance=1e-9):
+    expected = pipeline.predict_proba(data.copy())
+    actual = compiled.predict_proba(data)
+    max_difference = float(np.abs(expected - actual).max())
+    if max_difference > tolerance or (expected.argmax(axis=1) != actual.argmax(axis=1)).any():
+        raise ValueError(f'Compiled model differs from the pipeline by up to {max_difference:.3g}')
+    return max_difference
+
+
+def export(model_path=local_model_path, output_path=compiled_model_path, data_path=parity_data_path, pipeline=None):
+    # The pipeline can be passed in when it is already loaded from model_path
+    if pipeline is None:
+        pipeline = load_pipeline(model_path)
+    compiled = CompiledGradientBoosting.from_pipeline(pipeline, file_fingerprint(model_path))
+    data = to_model_frame(load_frame(data_path))
+    max_difference = check_parity(pipeline, compiled, data)
+    # Written under a temporary name so a concurrent reader never sees a partial file
+    tmp_path = f'{output_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    compiled.save(tmp_path)
+    os.replace(tmp_path, output_path)
+    return max_difference, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the Gradient Boosting pipeline to NumPy arrays.')
+    parser.add_argument('--model', default=local_model_path)
+    parser.add_argument('--output', default=compiled_model_path)
+    parser.add_argument('--data', default=parity_data_path, help='Rows used for the parity check')
+    args = parser.parse_args()
+
+    max_difference, rows = export(args.model, args.output, args.data)
+    print(f'Parity checked on {rows:,} rows (max probability difference {max_difference:.3g})')
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Background warm-up, started from app.py when the first visitor arrives.
+#
+# Imports the heavy libraries the pages load late, loads the label encoder and
+# every model through the shared predictor cache, and scores one customer
+# with each so lazily built state is ready as well. Pages that ask for a
+# model while the warm-up is still loading it wait for that load instead of
+# starting a second one.
+import importlib
+import logging
+import threading
+import time
+from utils.metrics import enabled, registry
+
+# Imported in this order; the pages import the charting libraries only when they
+# draw a chart, and most of sklearn loads with the first model
+heavy_modules = ['pandas', 'sklearn.pipeline', 'joblib', 'plotly.express', 'plotly.graph_objects',
+                 'streamlit_shadcn_ui']
+
+# A typical customer, scored once by each model
+sample_record = {
+    'customerID': '7590-VHVEG', 'gender': 'Female', 'SeniorCitizen': 0, 'Partner': 'Yes', 'Dependents': 'No',
+    'tenure': 1, 'PhoneService': 'No', 'MultipleLines': 'No phone service', 'InternetService': 'DSL',
+    'OnlineSecurity': 'No', 'OnlineBackup': 'Yes', 'DeviceProtection': 'No', 'TechSupport': 'No',
+    'StreamingTV': 'No', 'StreamingMovies': 'No', 'Contract': 'Month-to-month', 'PaperlessBilling': 'Yes',
+    'PaymentMethod': 'Electronic check', 'MonthlyCharges': 29.85, 'TotalCharges': 29.85,
+}
+
+_lock = threading.Lock()
+_status = {'state': 'not started', 'timings': [], 'error': None}
+
+
+def _step(kind, name, function):
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    _status['timings'].append({'step': kind, 'name': name, 'seconds': seconds})
+    if enabled:
+        registry.record(f'warmup_{kind}', seconds, name)
+
+
+def _run():
+    start = time.perf_counter()
+    # An optional library that fails to import is logged and skipped; the models are warmed up regardless
+    failed = []
+    for module in heavy_modules:
+        try:
+            _step('import', module, lambda: importlib.import_module(module))
+        except Exception:
+            logging.getLogger(__name__).warning('Warm-up could not import %s', module, exc_info=True)
+            failed.append(module)
+    try:
+        from utils.inference import available_models, get_predictor, load_encoder
+        _step('load', 'label encoder', load_encoder)
+        for name in available_models():
+            _step('load', name, lambda: get_predictor(name))
+            _step('score', name, lambda: get_predictor(name).predict_one(sample_record))
+        _status['state'] = 'ready'
+        if failed:
+            _status['error'] = f"Could not import {', '.join(failed)}"
+    except Exception as error:
+        logging.getLogger(__name__).exception('Model warm-up failed')
+        _status.update(state='failed', error=str(error))
+    _status['seconds'] = time.perf_counter() - start
+
+
+# -------- Start the warm-up once per process; later calls return immediately
+def start_warmup():
+    with _lock:
+        if _status['state'] == 'not started':
+            _status['state'] = 'running'
+            _status['started_at'] = time.time()
+            threading.Thread(target=_run, name='warmup', daemon=True).start()
+    return warmup_status()
+
+
+def warmup_status():
+    return dict(_status, timings=list(_status['timings']))